@@ -0,0 +1,77 @@
+"""In-process stand-in for the MQTT broker of a local TSUN proxy."""
+
+from collections.abc import Callable
+import json
+import zlib
+
+MessageCallback = Callable[[str, str], None]
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Return true if an MQTT topic matches a filter with + and # wildcards."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level not in ("+", topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class MockBroker:
+    """Deliver published messages synchronously to the matching subscribers."""
+
+    def __init__(self) -> None:
+        """Initialize the broker."""
+        self._subscriptions: list[tuple[str, MessageCallback]] = []
+        self.messages = 0
+
+    async def subscribe(
+        self, topic_filter: str, callback: MessageCallback
+    ) -> Callable[[], None]:
+        """Subscribe to a topic filter, return the unsubscribe function."""
+        subscription = (topic_filter, callback)
+        self._subscriptions.append(subscription)
+        return lambda: self._subscriptions.remove(subscription)
+
+    def publish(self, topic: str, payload: str) -> None:
+        """Publish a message."""
+        self.messages += 1
+        for topic_filter, callback in list(self._subscriptions):
+            if topic_matches(topic_filter, topic):
+                callback(topic, payload)
+
+    def publish_inverter(
+        self, node: str, tick: int, prefix: str = "tsun", pv_inputs: int = 2
+    ) -> None:
+        """Publish the state topics of a TSUN proxy for a synthetic inverter."""
+        power = 100 + zlib.crc32(f"{node}/{tick}".encode()) % 300
+        states = {
+            "grid": {
+                "Voltage": 230.1,
+                "Current": round(power / 230, 2),
+                "Frequency": 50.0,
+                "Output_Power": power,
+            },
+            "input": {
+                f"pv{index}": {
+                    "Voltage": 30.5,
+                    "Current": round(power / pv_inputs / 30.5, 2),
+                    "Power": power / pv_inputs,
+                }
+                for index in range(1, pv_inputs + 1)
+            },
+            "total": {"Daily_Generation": 1.5 + tick * 0.01},
+            "env": {"Inverter_Temp": 35, "Rated_Power": 800},
+            "inverter": {
+                "Manufacturer": "TSUN",
+                "Equipment_Model": "TSOL-MS800",
+                "Serial_Number": node,
+                "Version": "V1.2.3",
+            },
+        }
+        for category, state in states.items():
+            self.publish(f"{prefix}/{node}/{category}", json.dumps(state))
@@ -0,0 +1,247 @@
+"""Local stand-in for the TalentMonitor cloud API."""
+
+import asyncio
+from dataclasses import dataclass
+import random
+import zlib
+
+from aiohttp import web
+
+API_PREFIX = "/prod-api"
+
+
+@dataclass
+class MockServerConfig:
+    """Configuration of the mock TalentMonitor server."""
+
+    inverters: int = 10
+    power_stations: int = 1
+    # Mean latency and jitter of each response in seconds
+    latency: float = 0.05
+    jitter: float = 0.01
+    # Probability of answering a data request with 401, 429 or 500
+    unauthorized_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    # Retry-After in seconds sent with 429 responses
+    retry_after: float = 0.1
+    seed: int = 0
+
+
+@dataclass
+class MockServerStats:
+    """Counters of the mock TalentMonitor server."""
+
+    requests: int = 0
+    logins: int = 0
+    unauthorized: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+class MockTalentMonitorServer:
+    """aiohttp application serving the endpoints used by pyTalentMonitor."""
+
+    def __init__(self, config: MockServerConfig) -> None:
+        """Initialize the server."""
+        self.config = config
+        self.stats = MockServerStats()
+        self._random = random.Random(config.seed)
+        self._tick = 0
+        self._runner: web.AppRunner | None = None
+        self.base_url: str | None = None
+
+    def advance(self) -> None:
+        """Let the simulated devices produce new values."""
+        self._tick += 1
+
+    def application(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post(f"{API_PREFIX}/login", self._login)
+        app.router.add_get(
+            f"{API_PREFIX}/tools/device/selectDeviceInverter", self._inverter_list
+        )
+        app.router.add_get(
+            f"{API_PREFIX}/tools/device/selectDeviceInverterInfo", self._inverter_info
+        )
+        app.router.add_get(
+            f"{API_PREFIX}/system/station/list", self._power_station_list
+        )
+        app.router.add_get(
+            f"{API_PREFIX}/system/station/getPowerStationByGuid",
+            self._power_station_info,
+        )
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start the server and return its base URL."""
+        self._runner = web.AppRunner(self.application(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Count requests and inject latency and errors."""
+        stats = self.stats
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            delay = self.config.latency + self._random.uniform(
+                -self.config.jitter, self.config.jitter
+            )
+            await asyncio.sleep(max(delay, 0))
+
+            if not request.path.endswith("/login"):
+                if self._random.random() < self.config.unauthorized_rate:
+                    stats.unauthorized += 1
+                    return web.json_response({"code": 401}, status=401)
+                if self._random.random() < self.config.rate_limit_rate:
+                    stats.rate_limited += 1
+                    return web.json_response(
+                        {"code": 429},
+                        status=429,
+                        headers={"Retry-After": str(self.config.retry_after)},
+                    )
+                if self._random.random() < self.config.server_error_rate:
+                    stats.server_errors += 1
+                    return web.json_response({"code": 500}, status=500)
+            return await handler(request)
+        finally:
+            stats.in_flight -= 1
+
+    async def _login(self, request: web.Request) -> web.Response:
+        """Handle the login."""
+        self.stats.logins += 1
+        return web.json_response({"code": 200, "token": f"token-{self.stats.logins}"})
+
+    async def _inverter_list(self, request: web.Request) -> web.Response:
+        """Return the inverter list."""
+        rows = [
+            {"deviceGuid": inverter_guid(index), "deviceSn": f"SN{index:08d}"}
+            for index in range(self.config.inverters)
+        ]
+        return web.json_response(page(request, rows))
+
+    async def _inverter_info(self, request: web.Request) -> web.Response:
+        """Return the details of an inverter."""
+        guid = request.query.get("deviceGuid", "")
+        return web.json_response({"code": 200, "data": self._inverter_data(guid)})
+
+    async def _power_station_list(self, request: web.Request) -> web.Response:
+        """Return the power station list."""
+        rows = [
+            {
+                "powerStationGuid": power_station_guid(index),
+                "stationName": f"Station {index + 1}",
+            }
+            for index in range(self.config.power_stations)
+        ]
+        return web.json_response(page(request, rows))
+
+    async def _power_station_info(self, request: web.Request) -> web.Response:
+        """Return the details of a power station."""
+        guid = request.query.get("powerStationGuid", "")
+        return web.json_response(
+            {"code": 200, "data": self._power_station_data(guid)}
+        )
+
+    def _variation(self, guid: str) -> int:
+        """Return a deterministic pseudo random number per device and tick."""
+        return zlib.crc32(f"{guid}/{self._tick}".encode())
+
+    def _inverter_data(self, guid: str) -> dict:
+        """Return a synthetic inverter payload."""
+        power = 100 + self._variation(guid) % 300
+        pv = [
+            {
+                "power": power / 2,
+                "powerNamed": f"{power / 2} W",
+                "voltage": 30.5,
+                "current": round(power / 61, 2),
+            }
+            for _ in range(2)
+        ]
+        pv.append({"power": 0, "voltage": 0, "current": 0})
+        return {
+            "deviceGuid": guid,
+            "deviceSn": guid,
+            "model": "TSOL-MS800",
+            "serialNumber": guid,
+            "firmwareVersion1": "V1.2.3",
+            "nameOfManufacturer": "TSUNESS",
+            "ratedPower": 800,
+            "ratedPowerNamed": "800 W",
+            "inverterTemp": 35.2,
+            "pvCount": 3,
+            "acPhaseCount": 1,
+            "acPhaseExpress": "L1",
+            "pv": pv,
+            "phase": [
+                {
+                    "activePower": power,
+                    "activePowerNamed": f"{power} W",
+                    "voltage": 230.1,
+                    "current": round(power / 230, 2),
+                    "frequency": 50.0,
+                }
+            ],
+            "lastDataUpdateTime": f"2024-06-01T12:{self._tick % 60:02d}:00",
+            # Fields not used by the integration, as found in real payloads
+            "stationName": "Station",
+            "timeZone": "+02:00",
+            "remark": "x" * 64,
+        }
+
+    def _power_station_data(self, guid: str) -> dict:
+        """Return a synthetic power station payload."""
+        power = 0.1 * (self._variation(guid) % 50)
+        return {
+            "powerStationGuid": guid,
+            "stationName": guid,
+            "totalActivePower": power,
+            "totalActivePowerNamed": f"{power:.1f} kW",
+            "dayEnergy": 1.5 + self._tick * 0.01,
+            "dayEnergyNamed": f"{1.5 + self._tick * 0.01:.2f} kWh",
+            "monthEnergy": 50,
+            "monthEnergyNamed": "50 kWh",
+            "yearEnergy": 600,
+            "yearEnergyNamed": "600 kWh",
+            "lastDataUpdateTime": f"2024-06-01T12:{self._tick % 60:02d}:00",
+        }
+
+
+def page(request: web.Request, rows: list[dict]) -> dict:
+    """Return the requested page of a list, all rows if no page is requested."""
+    if "pageNum" not in request.query:
+        return {"code": 200, "total": len(rows), "rows": rows}
+    page_size = int(request.query.get("pageSize", 10))
+    start = (int(request.query["pageNum"]) - 1) * page_size
+    return {
+        "code": 200,
+        "total": len(rows),
+        "rows": rows[start : start + page_size],
+    }
+
+
+def inverter_guid(index: int) -> str:
+    """Return the GUID of the synthetic inverter with the given index."""
+    return f"inverter-{index:05d}"
+
+
+def power_station_guid(index: int) -> str:
+    """Return the GUID of the synthetic power station with the given index."""
+    return f"station-{index:05d}"
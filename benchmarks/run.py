@@ -0,0 +1,204 @@
+"""Benchmark the polling path of pyTalentMonitor against the mock server.
+
+Run with ``scripts/benchmark`` or ``python3 -m benchmarks.run --help``.
+"""
+
+import argparse
+import asyncio
+from dataclasses import asdict
+from dataclasses import dataclass
+import json
+import statistics
+import time
+import tracemalloc
+
+from custom_components.tsun.pyTalentMonitor import TalentSolarMonitor
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+)
+from custom_components.tsun.pyTalentMonitor.session import create_session
+
+from .mock_server import MockServerConfig
+from .mock_server import MockTalentMonitorServer
+
+DEFAULT_DEVICE_COUNTS = (1, 10, 100, 1000)
+
+
+@dataclass
+class BenchmarkResult:
+    """Result of benchmarking one device count."""
+
+    devices: int
+    cycles: int
+    cycle_mean: float
+    cycle_p95: float
+    cycle_max: float
+    requests_per_cycle: float
+    logins: int
+    unauthorized: int
+    rate_limited: int
+    server_errors: int
+    max_in_flight: int
+    allocated_per_cycle_kib: float
+    peak_memory_kib: float
+    revision_bumps: int
+    revision_bumps_per_second: float
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the given percentile of the values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def benchmark(
+    devices: int, args: argparse.Namespace
+) -> BenchmarkResult:
+    """Benchmark fetch cycles for the given number of inverters."""
+    server = MockTalentMonitorServer(
+        MockServerConfig(
+            inverters=devices,
+            power_stations=max(1, devices // 10),
+            latency=args.latency,
+            jitter=args.jitter,
+            unauthorized_rate=args.unauthorized_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            server_error_rate=args.server_error_rate,
+        )
+    )
+    base_url = await server.start()
+    try:
+        async with create_session(args.concurrency, args.concurrency) as session:
+            client = TalentSolarMonitor(
+                "benchmark",
+                "benchmark",
+                session,
+                max_concurrent_requests=args.concurrency,
+                max_concurrent_requests_per_host=args.concurrency,
+                base_url=base_url,
+            )
+
+            # The first cycle includes the login and the discovery
+            await client.fetch_data()
+            requests_before = server.stats.requests
+            revisions_before = sum(client.get_revisions().values())
+
+            durations: list[float] = []
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+            for _ in range(args.cycles):
+                server.advance()
+                start = time.perf_counter()
+                await client.fetch_data()
+                durations.append(time.perf_counter() - start)
+            allocated_after, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            revision_bumps = sum(client.get_revisions().values()) - revisions_before
+            total_duration = sum(durations)
+            return BenchmarkResult(
+                devices=devices,
+                cycles=args.cycles,
+                cycle_mean=statistics.mean(durations),
+                cycle_p95=percentile(durations, 0.95),
+                cycle_max=max(durations),
+                requests_per_cycle=(server.stats.requests - requests_before)
+                / args.cycles,
+                logins=server.stats.logins,
+                unauthorized=server.stats.unauthorized,
+                rate_limited=server.stats.rate_limited,
+                server_errors=server.stats.server_errors,
+                max_in_flight=server.stats.max_in_flight,
+                allocated_per_cycle_kib=max(allocated_after - allocated_before, 0)
+                / 1024
+                / args.cycles,
+                peak_memory_kib=peak / 1024,
+                revision_bumps=revision_bumps,
+                revision_bumps_per_second=revision_bumps / total_duration
+                if total_duration
+                else 0.0,
+            )
+    finally:
+        await server.stop()
+
+
+def print_table(results: list[BenchmarkResult]) -> None:
+    """Print the results as a table."""
+    header = (
+        f"{'devices':>8} {'mean s':>8} {'p95 s':>8} {'max s':>8} "
+        f"{'req/cyc':>8} {'logins':>6} {'401':>5} {'429':>5} {'500':>5} "
+        f"{'alloc KiB':>10} {'peak KiB':>10} {'bumps/s':>10}"
+    )
+    print(header)  # noqa: T201
+    for result in results:
+        print(  # noqa: T201
+            f"{result.devices:>8} {result.cycle_mean:>8.3f} "
+            f"{result.cycle_p95:>8.3f} {result.cycle_max:>8.3f} "
+            f"{result.requests_per_cycle:>8.1f} {result.logins:>6} "
+            f"{result.unauthorized:>5} {result.rate_limited:>5} "
+            f"{result.server_errors:>5} "
+            f"{result.allocated_per_cycle_kib:>10.1f} "
+            f"{result.peak_memory_kib:>10.1f} "
+            f"{result.revision_bumps_per_second:>10.1f}"
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmarks for all device counts."""
+    results = [await benchmark(devices, args) for devices in args.devices]
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))  # noqa: T201
+    else:
+        print_table(results)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark TalentSolarMonitor.fetch_data against a local mock server"
+    )
+    parser.add_argument(
+        "--devices",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=list(DEFAULT_DEVICE_COUNTS),
+        help="Comma separated inverter counts (default: 1,10,100,1000)",
+    )
+    parser.add_argument("--cycles", type=int, default=5, help="Measured cycles")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Mean response latency in s"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.01, help="Response latency jitter in s"
+    )
+    parser.add_argument(
+        "--unauthorized-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a 401 response",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a 429 response",
+    )
+    parser.add_argument(
+        "--server-error-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a 500 response",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+        help="Maximum concurrent requests of the client",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -7,22 +7,28 @@ https://github.com/stephanu/ha_talent_monitor
 import asyncio
 import logging
 
+from custom_components.tsun.client import async_release_client
 from custom_components.tsun.coordinator import (
     TalentMonitorDataUpdateCoordinator,
+    token_store,
+    topology_store,
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core_config import Config
 from homeassistant.core import HomeAssistant
 
+from .const import CONF_FAST_STARTUP
 from .const import DOMAIN
 from .const import PLATFORMS
 from .const import STARTUP_MESSAGE
+from .services import async_setup_services
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
-async def async_setup(_hass: HomeAssistant, _config: Config):
-    """Set up this integration using YAML is not supported."""
+async def async_setup(hass: HomeAssistant, _config: Config):
+    """Set up the services, setting up this integration using YAML is not supported."""
+    async_setup_services(hass)
     return True
 
 
@@ -36,7 +42,22 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     coordinator = TalentMonitorDataUpdateCoordinator(hass, entry=entry)
 
-    await coordinator.async_config_entry_first_refresh()
+    try:
+        if (
+            entry.options.get(CONF_FAST_STARTUP, True)
+            and await coordinator.async_restore_topology()
+        ):
+            # The entities are created from the persisted topology with their
+            # restored states and go live when the refresh completes
+            await coordinator.async_prepare()
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+            )
+        else:
+            await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        await async_release_client(hass, entry)
+        raise
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
@@ -64,6 +85,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     )
     if unloaded:
         hass.data[DOMAIN].pop(entry.entry_id)
+        await async_release_client(hass, entry)
 
     return unloaded
 
@@ -72,3 +94,9 @@ async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
     await async_setup_entry(hass, entry)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data of a config entry."""
+    await token_store(hass, entry.entry_id).async_remove()
+    await topology_store(hass, entry.entry_id).async_remove()
@@ -0,0 +1,281 @@
+"""API clients and their pooled sessions shared between config entries."""
+
+import asyncio
+from datetime import timedelta
+import logging
+
+from custom_components.tsun.pyTalentMonitor import TalentSolarMonitor
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    DEFAULT_PAYLOAD_HISTORY_SIZE,
+)
+from custom_components.tsun.pyTalentMonitor.local import (
+    DEFAULT_TOPIC_PREFIX,
+    LocalInverterDataProvider,
+    LocalPowerStationDataProvider,
+)
+from custom_components.tsun.pyTalentMonitor.session import create_session
+from aiohttp import ClientSession
+from homeassistant.components import mqtt
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.const import CONF_USERNAME
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+from homeassistant.util.ssl import get_default_no_verify_context
+
+from .const import CONF_ADAPTIVE_POLLING
+from .const import CONF_DATA_SOURCE
+from .const import CONF_DISCOVERY_INTERVAL
+from .const import CONF_KEEP_RAW_DATA
+from .const import CONF_MAX_CONCURRENT_REQUESTS
+from .const import CONF_MAX_CONCURRENT_REQUESTS_PER_HOST
+from .const import CONF_PAYLOAD_HISTORY_SIZE
+from .const import CONF_TOPIC_PREFIX
+from .const import DATA_CLIENTS
+from .const import DATA_SOURCE_CLOUD
+from .const import DATA_SOURCE_LOCAL_MQTT
+from .const import DEFAULT_DISCOVERY_INTERVAL_MINUTES
+from .const import DOMAIN
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# Options of a config entry that configure the shared client and its polling
+CLIENT_OPTIONS = (
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    CONF_DISCOVERY_INTERVAL,
+    CONF_KEEP_RAW_DATA,
+    CONF_PAYLOAD_HISTORY_SIZE,
+    CONF_ADAPTIVE_POLLING,
+)
+
+
+class SharedClient:
+    """An API client together with the coordinators of the config entries using it.
+
+    The first coordinator owns the poll cycle of the client. The others do
+    not poll on their own, they publish the outcome of each cycle of the
+    owner. When the owner is released, the next coordinator takes over.
+    """
+
+    def __init__(
+        self,
+        api: TalentSolarMonitor,
+        options: dict,
+        session: ClientSession | None = None,
+    ) -> None:
+        """Initialize the shared client."""
+        self.api = api
+        self.options = options
+        self.session = session
+        self.coordinators: dict[str, DataUpdateCoordinator] = {}
+        self._unsub_close: CALLBACK_TYPE | None = None
+        self._unsub_mqtt: CALLBACK_TYPE | None = None
+        self._subscribe_lock = asyncio.Lock()
+
+    @property
+    def owner(self) -> DataUpdateCoordinator | None:
+        """Return the coordinator polling the client."""
+        return next(iter(self.coordinators.values()), None)
+
+    @callback
+    def async_cycle_finished(
+        self,
+        coordinator: DataUpdateCoordinator,
+        exception: Exception | None,
+        started: float,
+    ) -> None:
+        """Pass the outcome of a poll cycle of the owner to the other coordinators."""
+        if coordinator is not self.owner:
+            return
+        for other in list(self.coordinators.values())[1:]:
+            other.async_shared_cycle_finished(exception, started)
+
+    def close_on_shutdown(self, hass: HomeAssistant) -> None:
+        """Close the session when Home Assistant shuts down."""
+        if self.session is None:
+            return
+
+        async def _async_close_session(event: Event) -> None:
+            self._unsub_close = None
+            await self.session.close()
+
+        self._unsub_close = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, _async_close_session
+        )
+
+    async def async_subscribe_local(self, hass: HomeAssistant) -> None:
+        """Subscribe the local data source to the MQTT topics of the TSUN proxy.
+
+        The topics are subscribed once per client, however many config
+        entries share it, and unsubscribed when the client is closed.
+        """
+        async with self._subscribe_lock:
+            if self._unsub_mqtt is not None:
+                return
+
+            async def _async_mqtt_subscribe(topic_filter, message_callback):
+                @callback
+                def _async_message_received(message: mqtt.ReceiveMessage) -> None:
+                    message_callback(message.topic, message.payload)
+
+                return await mqtt.async_subscribe(
+                    hass, topic_filter, _async_message_received
+                )
+
+            self._unsub_mqtt = await self.api.inverter_data_provider.async_subscribe(
+                _async_mqtt_subscribe
+            )
+
+    async def async_close(self) -> None:
+        """Close the client once the last config entry released it."""
+        if self._unsub_mqtt is not None:
+            self._unsub_mqtt()
+            self._unsub_mqtt = None
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        if self.session is not None:
+            await self.session.close()
+
+
+def _client_options(entry: ConfigEntry) -> dict:
+    """Return the options of the config entry applying to its client."""
+    return {key: entry.options.get(key) for key in CLIENT_OPTIONS}
+
+
+def _account_key(entry: ConfigEntry) -> str:
+    """Return the key identifying the portal account or proxy of a config entry."""
+    if data_source(entry) == DATA_SOURCE_LOCAL_MQTT:
+        return f"{DATA_SOURCE_LOCAL_MQTT}:{topic_prefix(entry)}"
+    return (entry.data.get(CONF_USERNAME) or "").casefold()
+
+
+def data_source(entry: ConfigEntry) -> str:
+    """Return the data source of a config entry."""
+    return entry.options.get(CONF_DATA_SOURCE, DATA_SOURCE_CLOUD)
+
+
+def topic_prefix(entry: ConfigEntry) -> str:
+    """Return the MQTT topic prefix of the TSUN proxy of a config entry."""
+    return entry.options.get(CONF_TOPIC_PREFIX) or DEFAULT_TOPIC_PREFIX
+
+
+def _create_session(entry: ConfigEntry) -> ClientSession:
+    """Create the pooled session used for the requests of an API client.
+
+    Every client has its own session, so its connection limits follow the
+    concurrency options of the client instead of those of another account.
+    """
+    return create_session(
+        entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        ),
+        entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS_PER_HOST,
+            DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+        ),
+        get_default_no_verify_context(),
+        {"User-Agent": SERVER_SOFTWARE},
+    )
+
+
+def _create_client(hass: HomeAssistant, entry: ConfigEntry) -> SharedClient:
+    """Create an API client configured by the options of the config entry."""
+    if data_source(entry) == DATA_SOURCE_LOCAL_MQTT:
+        # The local data source does not send any request to the cloud
+        return SharedClient(
+            TalentSolarMonitor(
+                inverter_data_provider=LocalInverterDataProvider(topic_prefix(entry)),
+                power_station_data_provider=LocalPowerStationDataProvider(),
+            ),
+            _client_options(entry),
+        )
+
+    session = _create_session(entry)
+    api = TalentSolarMonitor(
+        entry.data.get(CONF_USERNAME),
+        entry.data.get(CONF_PASSWORD),
+        session,
+        entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        ),
+        entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS_PER_HOST,
+            DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+        ),
+        timedelta(
+            minutes=entry.options.get(
+                CONF_DISCOVERY_INTERVAL, DEFAULT_DISCOVERY_INTERVAL_MINUTES
+            )
+        ).total_seconds(),
+        entry.options.get(CONF_KEEP_RAW_DATA, False),
+        entry.options.get(CONF_PAYLOAD_HISTORY_SIZE, DEFAULT_PAYLOAD_HISTORY_SIZE),
+        time_zone=dt_util.get_default_time_zone(),
+    )
+    shared_client = SharedClient(api, _client_options(entry), session)
+    shared_client.close_on_shutdown(hass)
+    return shared_client
+
+
+@callback
+def async_acquire_client(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: DataUpdateCoordinator
+) -> SharedClient:
+    """Return the API client of the account of the config entry.
+
+    Config entries of the same account share one client, so they log in
+    once and share the poll cycles. The client is created with the options
+    of the first config entry of the account, differing options of later
+    config entries are ignored with a warning.
+    """
+    clients: dict[str, SharedClient] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_CLIENTS, {}
+    )
+    key = _account_key(entry)
+    if key not in clients:
+        clients[key] = _create_client(hass, entry)
+    else:
+        _LOGGER.debug("Sharing the API client of account %s", key)
+        if _client_options(entry) != clients[key].options:
+            _LOGGER.warning(
+                "Config entry %s shares the API client of account %s with "
+                "another config entry, its client and polling options are "
+                "ignored in favour of those of the first config entry",
+                entry.title,
+                key,
+            )
+
+    shared_client = clients[key]
+    shared_client.coordinators[entry.entry_id] = coordinator
+    return shared_client
+
+
+async def async_release_client(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Release the API client used by the config entry.
+
+    The client and its session are closed with the last config entry using it.
+    """
+    clients: dict[str, SharedClient] = hass.data.get(DOMAIN, {}).get(
+        DATA_CLIENTS, {}
+    )
+    key = _account_key(entry)
+    shared_client = clients.get(key)
+    if shared_client is None:
+        return
+
+    owner = shared_client.owner
+    shared_client.coordinators.pop(entry.entry_id, None)
+    if not shared_client.coordinators:
+        clients.pop(key)
+        await shared_client.async_close()
+    elif shared_client.owner is not owner:
+        shared_client.owner.async_start_polling()
@@ -3,15 +3,42 @@
 import logging
 
 from custom_components.tsun.pyTalentMonitor import TalentSolarMonitor
-from custom_components.tsun.pyTalentMonitor.data_provider import AuthenticationError
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    DEFAULT_PAYLOAD_HISTORY_SIZE,
+    AuthenticationError,
+)
+from custom_components.tsun.pyTalentMonitor.local import DEFAULT_TOPIC_PREFIX
+from custom_components.tsun.pyTalentMonitor.session import create_session
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from aiohttp import ClientConnectorError
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD
 from homeassistant.const import CONF_USERNAME
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
-
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+
+from .const import CONF_ADAPTIVE_POLLING
+from .const import CONF_DATA_SOURCE
+from .const import CONF_DISCOVERY_INTERVAL
+from .const import CONF_FAST_STARTUP
+from .const import CONF_HISTORY
+from .const import CONF_KEEP_RAW_DATA
+from .const import CONF_MAX_DATA_AGE
+from .const import CONF_MAX_CONCURRENT_REQUESTS
+from .const import CONF_MAX_CONCURRENT_REQUESTS_PER_HOST
+from .const import CONF_PAYLOAD_HISTORY_SIZE
+from .const import CONF_PUSH_FLUSH_WINDOW
+from .const import CONF_SIGNIFICANCE_FILTER
+from .const import CONF_TOPIC_PREFIX
+from .const import DATA_SOURCE_CLOUD
+from .const import DATA_SOURCE_LOCAL_MQTT
+from .const import DATA_SOURCES
+from .const import DEFAULT_DISCOVERY_INTERVAL_MINUTES
+from .const import DEFAULT_MAX_DATA_AGE_MINUTES
+from .const import DEFAULT_PUSH_FLUSH_WINDOW_SECONDS
 from .const import DOMAIN
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
@@ -22,6 +49,11 @@ CLOUD_CONNECTION_SCHEMA = vol.Schema(
         vol.Required(CONF_PASSWORD): cv.string,
     }
 )
+LOCAL_CONNECTION_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TOPIC_PREFIX, default=DEFAULT_TOPIC_PREFIX): cv.string,
+    }
+)
 
 
 class TalentMonitorFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -34,6 +66,12 @@ class TalentMonitorFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize."""
         self._errors = {}
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for TalentMonitor."""
+        return TalentMonitorOptionsFlowHandler()
+
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
         self._errors = {}
@@ -43,9 +81,12 @@ class TalentMonitorFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         # if self._async_current_entries():
         #     return self.async_abort(reason="single_instance_allowed")
 
-        return await self.async_step_connection_talent_monitor_cloud(user_input)
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=["connection_talent_monitor_cloud", "connection_local_mqtt"],
+        )
 
-    async def async_step_connection_talent_monitor_cloud(self, user_input):
+    async def async_step_connection_talent_monitor_cloud(self, user_input=None):
         """Show the configuration form to edit location data."""
         _LOGGER.debug(
             "Config flow async_step_connection_talent_monitor_cloud %s", user_input
@@ -70,15 +111,137 @@ class TalentMonitorFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             errors=self._errors,
         )
 
+    async def async_step_connection_local_mqtt(self, user_input=None):
+        """Configure the local data source, which needs no cloud credentials."""
+        _LOGGER.debug("Config flow async_step_connection_local_mqtt %s", user_input)
+
+        if user_input is not None:
+            topic_prefix = user_input[CONF_TOPIC_PREFIX].strip("/")
+            if topic_prefix:
+                return self.async_create_entry(
+                    title=f"TSUN proxy ({topic_prefix})",
+                    data={},
+                    options={
+                        CONF_DATA_SOURCE: DATA_SOURCE_LOCAL_MQTT,
+                        CONF_TOPIC_PREFIX: topic_prefix,
+                    },
+                )
+            self._errors["base"] = "topic_prefix"
+
+        return self.async_show_form(
+            step_id="connection_local_mqtt",
+            data_schema=LOCAL_CONNECTION_SCHEMA,
+            errors=self._errors,
+        )
+
     async def _test_credentials_cloud_talent_monitor(self, username, password):
         """Return true if credentials is valid."""
         try:
-            session = async_create_clientsession(self.hass)
-            client = TalentSolarMonitor(username, password, session)
-            await client.login()
+            # A session of its own, closed again once the login was checked
+            async with create_session(
+                headers={"User-Agent": SERVER_SOFTWARE}
+            ) as session:
+                client = TalentSolarMonitor(username, password, session)
+                await client.login()
             return True
         except ClientConnectorError:
             _LOGGER.exception("ClientConnectorError")
         except AuthenticationError:
             _LOGGER.exception("TalentMonitorError")
         return False
+
+
+class TalentMonitorOptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for TalentMonitor."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+        if user_input is not None:
+            if (
+                user_input[CONF_DATA_SOURCE] == DATA_SOURCE_CLOUD
+                and not self.config_entry.data.get(CONF_USERNAME)
+            ):
+                # Entries of the local data source were created without credentials
+                errors["base"] = "credentials_required"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            errors=errors,
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_DATA_SOURCE,
+                        default=options.get(CONF_DATA_SOURCE, DATA_SOURCE_CLOUD),
+                    ): vol.In(DATA_SOURCES),
+                    vol.Optional(
+                        CONF_TOPIC_PREFIX,
+                        default=options.get(
+                            CONF_TOPIC_PREFIX, DEFAULT_TOPIC_PREFIX
+                        ),
+                    ): cv.string,
+                    vol.Optional(
+                        CONF_PUSH_FLUSH_WINDOW,
+                        default=options.get(
+                            CONF_PUSH_FLUSH_WINDOW, DEFAULT_PUSH_FLUSH_WINDOW_SECONDS
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        default=options.get(
+                            CONF_MAX_CONCURRENT_REQUESTS,
+                            DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Optional(
+                        CONF_MAX_CONCURRENT_REQUESTS_PER_HOST,
+                        default=options.get(
+                            CONF_MAX_CONCURRENT_REQUESTS_PER_HOST,
+                            DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        default=options.get(CONF_ADAPTIVE_POLLING, True),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_DISCOVERY_INTERVAL,
+                        default=options.get(
+                            CONF_DISCOVERY_INTERVAL,
+                            DEFAULT_DISCOVERY_INTERVAL_MINUTES,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                    vol.Optional(
+                        CONF_MAX_DATA_AGE,
+                        default=options.get(
+                            CONF_MAX_DATA_AGE, DEFAULT_MAX_DATA_AGE_MINUTES
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                    vol.Optional(
+                        CONF_SIGNIFICANCE_FILTER,
+                        default=options.get(CONF_SIGNIFICANCE_FILTER, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_FAST_STARTUP,
+                        default=options.get(CONF_FAST_STARTUP, True),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_HISTORY,
+                        default=options.get(CONF_HISTORY, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_KEEP_RAW_DATA,
+                        default=options.get(CONF_KEEP_RAW_DATA, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_PAYLOAD_HISTORY_SIZE,
+                        default=options.get(
+                            CONF_PAYLOAD_HISTORY_SIZE, DEFAULT_PAYLOAD_HISTORY_SIZE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=500)),
+                }
+            ),
+        )
@@ -19,9 +19,42 @@ PLATFORMS = [SENSOR]
 # Configuration and options
 CONF_CONNECTION_TALENT_MONITOR_CLOUD = "talent_monitor_cloud"
 CONF_CONNECTION_TALENT_MONITOR_CLOUD_LABEL = "TALENT Monitoring and Management Portal"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_DATA_SOURCE = "data_source"
+CONF_DISCOVERY_INTERVAL = "discovery_interval"
+CONF_FAST_STARTUP = "fast_startup"
+CONF_HISTORY = "history"
+CONF_KEEP_RAW_DATA = "keep_raw_data"
+CONF_MAX_DATA_AGE = "max_data_age"
+CONF_PAYLOAD_HISTORY_SIZE = "payload_history_size"
+CONF_PUSH_FLUSH_WINDOW = "push_flush_window"
+CONF_SIGNIFICANCE_FILTER = "significance_filter"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_MAX_CONCURRENT_REQUESTS_PER_HOST = "max_concurrent_requests_per_host"
+CONF_TOPIC_PREFIX = "topic_prefix"
+
+# Data sources
+DATA_SOURCE_CLOUD = "cloud"
+DATA_SOURCE_LOCAL_MQTT = "local_mqtt"
+DATA_SOURCES = [DATA_SOURCE_CLOUD, DATA_SOURCE_LOCAL_MQTT]
 
 # Defaults
 DEFAULT_NAME = DOMAIN
+DEFAULT_DISCOVERY_INTERVAL_MINUTES = 60
+DEFAULT_MAX_DATA_AGE_MINUTES = 15
+DEFAULT_PUSH_FLUSH_WINDOW_SECONDS = 1.0
+
+# Keys in hass.data[DOMAIN] besides the config entry ids
+DATA_CLIENTS = "clients"
+DATA_HISTORY = "history"
+
+# Services
+SERVICE_GET_HISTORY = "get_history"
+
+# Storage
+STORAGE_VERSION = 1
+STORAGE_KEY_TOKEN = f"{DOMAIN}.token"
+STORAGE_KEY_TOPOLOGY = f"{DOMAIN}.topology"
 
 
 STARTUP_MESSAGE = f"""
@@ -1,26 +1,75 @@
 """Data Update Coordinator for the TalentMonitor integration."""
 
 import logging
+import time
+from datetime import datetime
 from datetime import timedelta
+from typing import NamedTuple
 
-from custom_components.tsun.pyTalentMonitor import TalentSolarMonitor
+from custom_components.tsun.pyTalentMonitor.retry import CircuitOpenError
+from homeassistant.components import mqtt
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_PASSWORD
-from homeassistant.const import CONF_USERNAME
+from homeassistant.const import SUN_EVENT_SUNRISE
 from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
 from homeassistant.exceptions import ConfigEntryError
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.sun import get_astral_event_next
+from homeassistant.helpers.sun import is_up
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .client import async_acquire_client
+from .client import data_source
+from .const import CONF_ADAPTIVE_POLLING
+from .const import CONF_HISTORY
+from .const import CONF_MAX_DATA_AGE
+from .const import CONF_PUSH_FLUSH_WINDOW
+from .const import DATA_SOURCE_LOCAL_MQTT
+from .const import DEFAULT_MAX_DATA_AGE_MINUTES
+from .const import DEFAULT_PUSH_FLUSH_WINDOW_SECONDS
 from .const import DOMAIN
+from .const import STORAGE_KEY_TOKEN
+from .const import STORAGE_KEY_TOPOLOGY
+from .const import STORAGE_VERSION
+from .history import async_get_history_store
+from .scheduler import AdaptivePollingScheduler
 
 
 SCAN_INTERVAL = timedelta(seconds=30)
+# The local data source is pushed, polling only refreshes the availability
+LOCAL_SCAN_INTERVAL = timedelta(seconds=60)
+TOKEN_SAVE_DELAY = 1
+TOPOLOGY_SAVE_DELAY = 10
+# Coordinators sharing a client reuse a fetch cycle that is at most this old
+MIN_FETCH_INTERVAL = 5
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
+class DeviceState(NamedTuple):
+    """Update state of a device as published to the entities."""
+
+    revision: int
+    # The values are left over from an earlier fetch
+    stale: bool
+    # The values are recent enough to be shown
+    available: bool
+
+
+def token_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store persisting the API token of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_TOKEN}.{entry_id}")
+
+
+def topology_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store persisting the device topology of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_TOPOLOGY}.{entry_id}")
+
+
 class TalentMonitorDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
 
@@ -31,14 +80,21 @@ class TalentMonitorDataUpdateCoordinator(DataUpdateCoordinator):
     ) -> None:
         """Initialize."""
         self.platforms = []
+        self._local = data_source(entry) == DATA_SOURCE_LOCAL_MQTT
 
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+        self._poll_interval = LOCAL_SCAN_INTERVAL if self._local else SCAN_INTERVAL
 
-        username = entry.data.get(CONF_USERNAME)
-        password = entry.data.get(CONF_PASSWORD)
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=DOMAIN,
+            update_interval=self._poll_interval,
+            always_update=False,
+        )
 
-        session = async_get_clientsession(hass, verify_ssl=False)
-        client = TalentSolarMonitor(username, password, session)
+        self._shared_client = async_acquire_client(hass, entry, self)
+        client = self._shared_client.api
 
         if client is None:
             _LOGGER.exception(
@@ -46,13 +102,262 @@ class TalentMonitorDataUpdateCoordinator(DataUpdateCoordinator):
             )
             raise ConfigEntryError
 
+        if not self._polls:
+            # The coordinator owning the shared client polls for all of them
+            self.update_interval = None
+
         self.api = client
+        self._token_store = token_store(hass, entry.entry_id)
+        self._topology_store = topology_store(hass, entry.entry_id)
+        self._saved_topology: dict | None = None
+        self._push_debouncer: Debouncer | None = None
+        self._scheduler = (
+            AdaptivePollingScheduler(SCAN_INTERVAL)
+            if entry.options.get(CONF_ADAPTIVE_POLLING, True) and not self._local
+            else None
+        )
+        self._history = (
+            async_get_history_store(hass)
+            if entry.options.get(CONF_HISTORY, False)
+            else None
+        )
+        self._max_data_age = timedelta(
+            minutes=entry.options.get(CONF_MAX_DATA_AGE, DEFAULT_MAX_DATA_AGE_MINUTES)
+        ).total_seconds()
+
+    async def _async_setup(self):
+        """Prepare the data source before the first refresh."""
+        await self.async_prepare()
+
+    async def async_prepare(self):
+        """Restore the persisted token or subscribe to the local data source."""
+        if self._local:
+            await self._async_subscribe_local()
+        else:
+            await self._async_restore_token()
+        if self.api.pushes_updates:
+            self._async_listen_for_pushed_updates()
+
+    @callback
+    def _async_listen_for_pushed_updates(self):
+        """Write pushed device updates to the entities at most once per window.
+
+        The first update after a quiet period is written immediately, further
+        updates within the window are coalesced into one write at its end.
+        """
+        self._push_debouncer = Debouncer(
+            self.hass,
+            _LOGGER,
+            cooldown=self.config_entry.options.get(
+                CONF_PUSH_FLUSH_WINDOW, DEFAULT_PUSH_FLUSH_WINDOW_SECONDS
+            ),
+            immediate=True,
+            function=self._async_flush_pushed_updates,
+        )
+        self.config_entry.async_on_unload(self._push_debouncer.async_shutdown)
+        self.config_entry.async_on_unload(
+            self.api.add_update_listener(self._async_device_pushed)
+        )
+
+    @callback
+    def _async_device_pushed(self, entity):
+        """Schedule writing a device changed by pushed data."""
+        self._push_debouncer.async_schedule_call()
+
+    @callback
+    def _async_flush_pushed_updates(self):
+        """Write the pushed device updates to the entities."""
+        self._async_save_topology()
+        if self._history is not None:
+            self._async_record_history()
+        self.async_set_updated_data(self._device_states())
+
+    async def _async_subscribe_local(self):
+        """Subscribe to the MQTT topics of the TSUN proxy."""
+        if not await mqtt.async_wait_for_mqtt_client(self.hass):
+            raise ConfigEntryNotReady("MQTT is not available")
+
+        await self._shared_client.async_subscribe_local(self.hass)
+
+    async def _async_restore_token(self):
+        """Restore the persisted token and persist the refreshed ones."""
+        stored = await self._token_store.async_load()
+        if (
+            stored
+            and stored.get("token")
+            and not self.api.token_manager.is_valid
+        ):
+            if self.api.token_manager.restore_token(
+                stored["token"], stored.get("expires_at")
+            ):
+                _LOGGER.debug("Restored persisted token")
+
+        self.config_entry.async_on_unload(
+            self.api.token_manager.add_listener(self._async_token_refreshed)
+        )
+
+    async def async_restore_topology(self) -> bool:
+        """Restore the persisted devices, return true if there were any."""
+        topology = await self._topology_store.async_load()
+        if not topology:
+            return False
+
+        self.api.restore_topology(topology)
+        self._saved_topology = topology
+        _LOGGER.debug("Restored persisted device topology")
+        return True
+
+    @callback
+    def _async_save_topology(self):
+        """Persist the device topology if it changed."""
+        topology = self.api.get_topology()
+        if topology != self._saved_topology:
+            self._saved_topology = topology
+            self._topology_store.async_delay_save(lambda: topology, TOPOLOGY_SAVE_DELAY)
+
+    @callback
+    def _async_record_history(self):
+        """Record the changed device values and write them in the executor."""
+        for entity in [*self.api.get_inverters(), *self.api.get_power_stations()]:
+            if entity.last_success is not None:
+                self._history.record(entity, entity.last_success)
+        # Only the detached rows are handed to the executor
+        pending = self._history.take_pending()
+        prune = self._history.prune_due(time.time())
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self.hass.async_add_executor_job(self._history.flush, pending, prune),
+            f"{DOMAIN} history flush",
+        )
+
+    @callback
+    def _async_token_refreshed(self, token: str | None, expires_at: float | None):
+        """Persist a refreshed token."""
+        self._token_store.async_delay_save(
+            lambda: {"token": token, "expires_at": expires_at}, TOKEN_SAVE_DELAY
+        )
+
+    @property
+    def _polls(self) -> bool:
+        """Return true if this coordinator owns the poll cycle of the shared client."""
+        return self._shared_client.owner is self
+
+    @callback
+    def async_start_polling(self) -> None:
+        """Take over the poll cycle of the shared client from a released coordinator."""
+        self.update_interval = self._poll_interval
+        self.config_entry.async_create_background_task(
+            self.hass, self.async_refresh(), f"{DOMAIN} refresh"
+        )
+
+    @callback
+    def async_shared_cycle_finished(
+        self, exception: Exception | None, started: float
+    ) -> None:
+        """Publish a poll cycle of the coordinator owning the shared client."""
+        try:
+            device_states = self._process_cycle(exception, started)
+        except UpdateFailed as err:
+            self.async_set_update_error(err)
+        else:
+            self.async_set_updated_data(device_states)
 
     async def _async_update_data(self):
         """Update data via library."""
         _LOGGER.debug("_async_update_data ")
+        exception = None
+        started = time.time()
         try:
-            await self.api.fetch_data()
-        except Exception as exception:
-            _LOGGER.exception("_async_update_data failed")
-            raise UpdateFailed() from exception
+            await self.api.fetch_data(MIN_FETCH_INTERVAL)
+        except Exception as err:
+            exception = err
+        self._shared_client.async_cycle_finished(self, exception, started)
+        return self._process_cycle(exception, started)
+
+    def _process_cycle(
+        self, exception: Exception | None, started: float
+    ) -> dict[str, DeviceState]:
+        """Return the device states after a fetch cycle started at started.
+
+        The cycle failed with exception if set.
+        """
+        if exception is not None:
+            # Devices fetched recently enough keep their last good values
+            device_states = self._device_states(failed_cycle_started=started)
+            if not any(state.available for state in device_states.values()):
+                if isinstance(exception, CircuitOpenError):
+                    raise UpdateFailed(
+                        "TalentMonitor API is unavailable, requests are paused"
+                    ) from exception
+                _LOGGER.error("_async_update_data failed", exc_info=exception)
+                raise UpdateFailed() from exception
+            _LOGGER.warning(
+                "Fetching TalentMonitor data failed, keeping the last data: %r",
+                exception,
+            )
+            return device_states
+
+        if self._scheduler is not None and self._polls:
+            self._schedule_adaptive_poll()
+        self._async_save_topology()
+        if self._history is not None:
+            self._async_record_history()
+
+        # Listeners are only called if a device state changed, see always_update
+        return self._device_states()
+
+    def _device_states(
+        self, failed_cycle_started: float | None = None
+    ) -> dict[str, DeviceState]:
+        """Return the update state of each inverter and power station.
+
+        A device whose last fetch failed keeps its values, but is only
+        available until its last successful fetch is older than the
+        configured maximum data age. After a failed cycle, devices updated
+        since the cycle started, e.g. pushed by a local source, are not stale.
+        """
+        now = time.time()
+        device_states = {}
+        for entity in [*self.api.get_inverters(), *self.api.get_power_stations()]:
+            stale = entity.stale or (
+                failed_cycle_started is not None
+                and (
+                    entity.last_success is None
+                    or entity.last_success < failed_cycle_started
+                )
+            )
+            age = entity.age(now)
+            device_states[entity.entity_id] = DeviceState(
+                entity.revision,
+                stale,
+                age is not None and (not stale or age <= self._max_data_age),
+            )
+        return device_states
+
+    def _schedule_adaptive_poll(self) -> None:
+        """Align the next poll with the expected upstream update."""
+        now = dt_util.utcnow()
+        self._scheduler.observe(self._latest_upstream_update(), now)
+        self.update_interval = self._scheduler.next_interval(
+            now,
+            is_up(self.hass, now),
+            get_astral_event_next(self.hass, SUN_EVENT_SUNRISE, now),
+        )
+        _LOGGER.debug("Next poll in %s", self.update_interval)
+
+    def _latest_upstream_update(self) -> datetime | None:
+        """Return the most recent lastDataUpdateTime of all devices."""
+        latest = None
+        for entity in [*self.api.get_power_stations(), *self.api.get_inverters()]:
+            sensor_value = entity.values.get("lastDataUpdateTime")
+            if sensor_value is None or not sensor_value.value:
+                continue
+            try:
+                update_time = datetime.fromisoformat(sensor_value.value)
+            except (TypeError, ValueError):
+                continue
+            if update_time.tzinfo is None:
+                update_time = update_time.replace(tzinfo=dt_util.get_default_time_zone())
+            if latest is None or update_time > latest:
+                latest = update_time
+        return latest
@@ -0,0 +1,100 @@
+"""Diagnostics support for TalentMonitor."""
+
+import re
+
+from custom_components.tsun.pyTalentMonitor.data_provider import Entity
+from custom_components.tsun.pyTalentMonitor.inverter import Inverter
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.const import CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    "token",
+    "serialNumber",
+    "serial_number",
+    "stationAddress",
+    "latitude",
+    "longitude",
+    "email",
+    "phone",
+    "phonenumber",
+    # The GUIDs identify the inverters and power stations in the portal
+    "deviceGuid",
+    "powerStationGuid",
+    "entity_id",
+}
+# GUIDs passed as query parameters of the recorded endpoints
+_GUID_PARAMETER = re.compile(r"\b(deviceGuid|powerStationGuid)=[^&]*")
+
+
+def _redact_payload(payload: dict) -> dict:
+    """Return a recorded API response with its identifying data redacted."""
+    return {
+        **async_redact_data(payload, TO_REDACT),
+        "endpoint": _GUID_PARAMETER.sub(rf"\1={REDACTED}", payload["endpoint"]),
+    }
+
+
+def _entity_diagnostics(entity: Entity) -> dict:
+    """Return the diagnostics of an inverter or power station."""
+    result = {
+        "entity_id": REDACTED,
+        "name": entity.name,
+        "revision": entity.revision,
+        "last_success": entity.last_success,
+        "failures": entity.failures,
+        "values": {key: list(value) for key, value in entity.values.items()},
+    }
+    if isinstance(entity, Inverter):
+        result["model"] = entity.model
+        result["firmware_version"] = entity.firmware_version
+        result["pv"] = [
+            {key: list(value) for key, value in pv.values.items()}
+            for pv in entity.pv
+        ]
+        result["phases"] = [
+            {
+                "name": phase.name,
+                **{key: list(value) for key, value in phase.values.items()},
+            }
+            for phase in entity.phases
+        ]
+    if entity.raw_data is not None:
+        result["raw_data"] = async_redact_data(entity.raw_data, TO_REDACT)
+    return result
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.api
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "power_stations": [
+            _entity_diagnostics(power_station)
+            for power_station in api.get_power_stations()
+        ],
+        "inverters": [
+            _entity_diagnostics(inverter) for inverter in api.get_inverters()
+        ],
+        "metrics": api.metrics.as_dict(),
+        "circuit_breaker": (
+            api.circuit_breaker.as_dict() if api.circuit_breaker is not None else None
+        ),
+        "recent_payloads": [
+            _redact_payload(payload) for payload in api.recent_payloads
+        ],
+    }
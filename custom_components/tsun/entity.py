@@ -1,14 +1,22 @@
 """TalentMonitorEntity class."""
 
+from datetime import datetime
 import logging
+from typing import Any
 
 from custom_components.tsun.pyTalentMonitor.data_provider import Entity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity import Entity as HomeAssistantEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from custom_components.tsun.pyTalentMonitor.inverter import Inverter
 
 from .const import DOMAIN
+from .coordinator import DeviceState
 from .const import NAME
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
@@ -18,6 +26,7 @@ class TalentMonitorEntity(CoordinatorEntity):
     """Base Class for TalentMonitor entities."""
 
     _attr_has_entity_name = True
+    _unrecorded_attributes = frozenset({"last_successful_update"})
 
     def __init__(self, coordinator, entity: Entity, entity_suffix: str = ""):
         """Initialize a TalentMonitor entity."""
@@ -34,30 +43,97 @@ class TalentMonitorEntity(CoordinatorEntity):
             name=device_name,
         )
 
+        self._talent_monitor_entity = entity
+        self._written_state = None
+
         _LOGGER.debug("Added TalentMonitor entity id='%s'", self.unique_id)
 
+    @property
+    def _device_state(self) -> DeviceState | None:
+        """Return the update state of the device published by the coordinator."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data.get(self._talent_monitor_entity.entity_id)
+
+    @property
+    def available(self) -> bool:
+        """Return true unless the data of the device is too old."""
+        device_state = self._device_state
+        return super().available and (
+            device_state is None or device_state.available
+        )
 
-class TalentMonitorInverterEntity(CoordinatorEntity):
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return whether the values are stale and when they were fetched."""
+        device_state = self._device_state
+        last_success = self._talent_monitor_entity.last_success
+        return {
+            "stale": device_state is not None and device_state.stale,
+            "last_successful_update": None
+            if last_success is None
+            else datetime.fromtimestamp(last_success, dt_util.UTC).isoformat(),
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the device state written when the entity was added."""
+        await super().async_added_to_hass()
+        self._written_state = (self._device_state, self.available)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the device state or the availability changed.
+
+        The write goes through _async_write_device_state of the sensor, which
+        follows this class in the MRO of the TalentMonitor sensors.
+        """
+        state = (self._device_state, self.available)
+        if state == self._written_state:
+            return
+
+        self._written_state = state
+        self._async_write_device_state()
+
+
+class TalentMonitorInverterEntity(TalentMonitorEntity):
     """Base Class for TalentMonitor inverter entities."""
 
-    _attr_has_entity_name = True
-
     def __init__(self, coordinator, inverter: Inverter, entity_suffix: str = ""):
         """Initialize a TalentMonitor inverter entity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, inverter, entity_suffix)
 
         device_id = f"{inverter.entity_id}"
         device_name = inverter.name
 
-        self._attr_unique_id = f"{device_id}{entity_suffix}"
-
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, device_id)},
-            manufacturer=inverter.data.get("nameOfManufacturer", NAME),
+            manufacturer=inverter.manufacturer or NAME,
             name=device_name,
-            serial_number=inverter.data.get("serialNumber", None),
-            sw_version=inverter.data.get("firmwareVersion1", None),
-            model=inverter.data.get("model", None),
+            serial_number=inverter.serial_number,
+            sw_version=inverter.firmware_version,
+            model=inverter.model,
         )
 
-        _LOGGER.debug("Added TalentMonitor entity id='%s'", self.unique_id)
+
+class TalentMonitorHubEntity(HomeAssistantEntity):
+    """Base Class for entities of the TalentMonitor account (hub) device.
+
+    Hub entities describe the API client itself and are polled, so they
+    keep updating even if no device data changes.
+    """
+
+    _attr_has_entity_name = True
+    _attr_should_poll = True
+
+    def __init__(self, coordinator, entry: ConfigEntry, entity_suffix: str):
+        """Initialize a TalentMonitor hub entity."""
+        self.coordinator = coordinator
+
+        self._attr_unique_id = f"{entry.entry_id}{entity_suffix}"
+
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            manufacturer=NAME,
+            name=entry.title,
+            entry_type=DeviceEntryType.SERVICE,
+        )
@@ -0,0 +1,337 @@
+"""Compact on-disk history of the TalentMonitor device telemetry.
+
+Each device gets one append-only file per UTC day and resolution. A file
+starts with a JSON header line naming its channels, followed by fixed size
+binary rows of a uint32 timestamp and one float32 per channel (NaN if the
+value is missing). Raw samples are downsampled to 5 minute and 1 hour
+buckets holding mean, min and max of each channel.
+"""
+
+from array import array
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+import json
+import logging
+import math
+from pathlib import Path
+import shutil
+import threading
+
+from custom_components.tsun.pyTalentMonitor.data_provider import Entity
+from custom_components.tsun.pyTalentMonitor.inverter import Inverter
+from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
+
+from .const import DATA_HISTORY
+from .const import DOMAIN
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+FILE_VERSION = 1
+RESOLUTION_RAW = "raw"
+# Bucket size in seconds of the downsampled resolutions
+AGGREGATE_RESOLUTIONS = {"5min": 300, "1h": 3600}
+RESOLUTIONS = (RESOLUTION_RAW, *AGGREGATE_RESOLUTIONS)
+# Days the files of each resolution are kept, None keeps them forever
+RETENTION_DAYS = {RESOLUTION_RAW: 7, "5min": 90, "1h": None}
+
+# Values of the payloads which are not telemetry
+EXCLUDED_KEYS = frozenset({"lastDataUpdateTime", "ratedPower"})
+
+# Device -> resolution -> rows of timestamp and channel values
+PendingRows = dict[str, dict[str, list[tuple[int, dict[str, float]]]]]
+
+
+def telemetry(entity: Entity) -> dict[str, float]:
+    """Return the numeric values of a device as flat channels."""
+    channels: dict[str, float] = {}
+
+    def add(prefix: str, values) -> None:
+        for key, sensor_value in values.items():
+            if key in EXCLUDED_KEYS:
+                continue
+            try:
+                channels[f"{prefix}{key}"] = float(sensor_value.value)
+            except (TypeError, ValueError):
+                continue
+
+    add("", entity.values)
+    if isinstance(entity, Inverter):
+        for pv in entity.pv:
+            add(f"pv{pv.index}.", pv.values)
+        for phase in entity.phases:
+            add(f"phase{phase.index}.", phase.values)
+    return channels
+
+
+def _day(timestamp: float) -> str:
+    """Return the UTC day of a timestamp as used in file names."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _read_file(path: Path) -> tuple[list[str], array, list[array]]:
+    """Read a history file into its channels, timestamps and value columns."""
+    with path.open("rb") as file:
+        header = json.loads(file.readline())
+        body = file.read()
+
+    channels: list[str] = header["channels"]
+    width = len(channels) + 1
+    # Ignore a partially written last row
+    body = body[: len(body) - len(body) % (4 * width)]
+    words = array("I")
+    words.frombytes(body)
+    values = array("f")
+    values.frombytes(body)
+    timestamps = words[0::width]
+    columns = [values[column::width] for column in range(1, width)]
+    return channels, timestamps, columns
+
+
+def _encode_rows(channels: list[str], rows: list[tuple[int, dict[str, float]]]) -> bytes:
+    """Encode rows of timestamp and channel values."""
+    data = array("f")
+    for timestamp, values in rows:
+        # The timestamp is stored as uint32 in the float32 slot of the row
+        data.frombytes(array("I", [timestamp]).tobytes())
+        data.extend(values.get(channel, math.nan) for channel in channels)
+    return data.tobytes()
+
+
+def _append_rows(path: Path, rows: list[tuple[int, dict[str, float]]]) -> None:
+    """Append rows to a history file, widening the file for new channels."""
+    new_channels = sorted({channel for _, values in rows for channel in values})
+    if path.exists():
+        with path.open("rb") as file:
+            channels = json.loads(file.readline())["channels"]
+        if set(new_channels) <= set(channels):
+            with path.open("ab") as file:
+                file.write(_encode_rows(channels, rows))
+            return
+
+        # A channel appeared, e.g. a new pv input: rewrite with all channels
+        old_channels, timestamps, columns = _read_file(path)
+        old_rows = [
+            (
+                timestamps[index],
+                {
+                    channel: column[index]
+                    for channel, column in zip(old_channels, columns)
+                },
+            )
+            for index in range(len(timestamps))
+        ]
+        rows = old_rows + rows
+        new_channels = sorted(set(old_channels) | set(new_channels))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = json.dumps({"version": FILE_VERSION, "channels": new_channels})
+    temp_path = path.with_suffix(".tmp")
+    with temp_path.open("wb") as file:
+        file.write(header.encode() + b"\n")
+        file.write(_encode_rows(new_channels, rows))
+    temp_path.replace(path)
+
+
+class _Bucket:
+    """Running aggregates of the samples within one downsampling bucket."""
+
+    __slots__ = ("start", "stats")
+
+    def __init__(self, start: int) -> None:
+        """Initialize an empty bucket."""
+        self.start = start
+        # Channel -> [sum, count, min, max]
+        self.stats: dict[str, list[float]] = {}
+
+    def add(self, values: dict[str, float]) -> None:
+        """Add a sample to the bucket."""
+        for channel, value in values.items():
+            if math.isnan(value):
+                continue
+            stats = self.stats.get(channel)
+            if stats is None:
+                self.stats[channel] = [value, 1, value, value]
+            else:
+                stats[0] += value
+                stats[1] += 1
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+
+    def row(self) -> tuple[int, dict[str, float]]:
+        """Return the aggregated row of the bucket."""
+        values = {}
+        for channel, (total, count, minimum, maximum) in self.stats.items():
+            values[f"{channel}.mean"] = total / count
+            values[f"{channel}.min"] = minimum
+            values[f"{channel}.max"] = maximum
+        return self.start, values
+
+
+class HistoryStore:
+    """Append-only history of the device telemetry with downsampling.
+
+    record(), take_pending() and prune_due() only touch the staged samples
+    in memory and must be called from the event loop. flush(), query() and
+    prune() do file I/O and must run in the executor; flush() only gets the
+    rows detached by take_pending(). Samples of an open downsampling bucket are lost if Home
+    Assistant stops before the bucket is complete.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the store writing below path."""
+        self._path = path
+        self._lock = threading.Lock()
+        self._pending: PendingRows = {}
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+        self._recorded_revisions: dict[str, int] = {}
+        self._pruned_day: str | None = None
+
+    def record(self, entity: Entity, timestamp: float) -> None:
+        """Stage the values of a device if they changed since the last record."""
+        if self._recorded_revisions.get(entity.entity_id) == entity.revision:
+            return
+        self._recorded_revisions[entity.entity_id] = entity.revision
+
+        values = telemetry(entity)
+        if not values:
+            return
+
+        timestamp = int(timestamp)
+        pending = self._pending.setdefault(entity.entity_id, {})
+        pending.setdefault(RESOLUTION_RAW, []).append((timestamp, values))
+        for resolution, size in AGGREGATE_RESOLUTIONS.items():
+            start = timestamp - timestamp % size
+            bucket = self._buckets.get((entity.entity_id, resolution))
+            if bucket is not None and bucket.start != start:
+                pending.setdefault(resolution, []).append(bucket.row())
+                bucket = None
+            if bucket is None:
+                bucket = self._buckets[(entity.entity_id, resolution)] = _Bucket(start)
+            bucket.add(values)
+
+    def _file(self, device_id: str, day: str, resolution: str) -> Path:
+        """Return the file of a device, day and resolution."""
+        return self._path / device_id / f"{day}.{resolution}.dat"
+
+    def take_pending(self) -> PendingRows:
+        """Detach and return the staged rows, to be written by flush()."""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def prune_due(self, timestamp: float) -> bool:
+        """Return true on the first call of each UTC day."""
+        today = _day(timestamp)
+        if today == self._pruned_day:
+            return False
+        self._pruned_day = today
+        return True
+
+    def flush(self, pending: PendingRows, prune: bool = False) -> None:
+        """Append rows detached by take_pending() to the files, pruning first if set."""
+        if prune:
+            self.prune(datetime.now(timezone.utc))
+
+        with self._lock:
+            for device_id, resolutions in pending.items():
+                for resolution, rows in resolutions.items():
+                    rows_by_day: dict[str, list] = {}
+                    for row in rows:
+                        rows_by_day.setdefault(_day(row[0]), []).append(row)
+                    for day, day_rows in rows_by_day.items():
+                        try:
+                            _append_rows(
+                                self._file(device_id, day, resolution), day_rows
+                            )
+                        except OSError:
+                            _LOGGER.exception(
+                                "Writing the history of %s failed", device_id
+                            )
+
+    def query(
+        self,
+        device_id: str,
+        start: datetime,
+        end: datetime,
+        resolution: str = RESOLUTION_RAW,
+        channels: list[str] | None = None,
+    ) -> dict:
+        """Return the history of a device between start and end.
+
+        The result is columnar: a list of timestamps and one list of values
+        per channel, aligned with the timestamps. Aggregated resolutions
+        have the channels <channel>.mean, <channel>.min and <channel>.max.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}")
+
+        start_timestamp = start.timestamp()
+        end_timestamp = end.timestamp()
+        times: list[int] = []
+        columns: dict[str, list[float | None]] = {}
+        day = start.astimezone(timezone.utc).date()
+        with self._lock:
+            while day <= end.astimezone(timezone.utc).date():
+                path = self._file(device_id, day.isoformat(), resolution)
+                day += timedelta(days=1)
+                if not path.exists():
+                    continue
+
+                file_channels, timestamps, file_columns = _read_file(path)
+                rows = [
+                    index
+                    for index, timestamp in enumerate(timestamps)
+                    if start_timestamp <= timestamp <= end_timestamp
+                ]
+                if not rows:
+                    continue
+
+                for channel, column in zip(file_channels, file_columns):
+                    if channels is not None and not any(
+                        channel == wanted or channel.startswith(f"{wanted}.")
+                        for wanted in channels
+                    ):
+                        continue
+                    values = columns.setdefault(channel, [None] * len(times))
+                    values.extend(
+                        None if math.isnan(column[index]) else column[index]
+                        for index in rows
+                    )
+                times.extend(timestamps[index] for index in rows)
+                for values in columns.values():
+                    values.extend([None] * (len(times) - len(values)))
+
+        return {
+            "device_id": device_id,
+            "resolution": resolution,
+            "time": times,
+            "values": columns,
+        }
+
+    def prune(self, now: datetime) -> None:
+        """Remove the files older than the retention of their resolution."""
+        if not self._path.exists():
+            return
+        with self._lock:
+            for device_path in self._path.iterdir():
+                for path in device_path.glob("*.dat"):
+                    day, resolution = path.name.split(".")[:2]
+                    retention = RETENTION_DAYS.get(resolution)
+                    if retention is None:
+                        continue
+                    if day < (now - timedelta(days=retention)).strftime("%Y-%m-%d"):
+                        path.unlink(missing_ok=True)
+                if not any(device_path.iterdir()):
+                    shutil.rmtree(device_path, ignore_errors=True)
+
+
+@callback
+def async_get_history_store(hass: HomeAssistant) -> HistoryStore:
+    """Return the history store shared by all config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_HISTORY not in domain_data:
+        domain_data[DATA_HISTORY] = HistoryStore(
+            Path(hass.config.path(".storage", f"{DOMAIN}.history"))
+        )
+    return domain_data[DATA_HISTORY]
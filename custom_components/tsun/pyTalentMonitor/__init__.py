@@ -2,22 +2,52 @@
 
 import argparse
 import asyncio
+import json
+from collections.abc import Callable
+from datetime import tzinfo
 import logging
+import time
 
 from aiohttp import ClientSession
+from custom_components.tsun.pyTalentMonitor.cassette import (
+    CassetteRecorder,
+    ReplayDataProvider,
+)
+from custom_components.tsun.pyTalentMonitor.metrics import ApiMetrics
 from custom_components.tsun.pyTalentMonitor.inverter import (
     Inverter,
     InverterDataProvider,
 )
-from custom_components.tsun.pyTalentMonitor.data_provider import DataProvider
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    DEFAULT_PAGE_PREFETCH,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PAYLOAD_HISTORY_SIZE,
+    DEFAULT_REQUEST_TIMEOUT,
+    BASE_URL,
+    DataProvider,
+    Entity,
+    TokenManager,
+)
 from custom_components.tsun.pyTalentMonitor.power_station import (
     PowerStation,
     PowerStationDataProvider,
 )
+from custom_components.tsun.pyTalentMonitor.retry import (
+    DEFAULT_MAX_RETRIES,
+    CircuitBreaker,
+)
+from custom_components.tsun.pyTalentMonitor.session import create_session
 
 # Configure logging
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
+# Interval in seconds for re-reading the device and power station lists
+DEFAULT_DISCOVERY_INTERVAL = 3600
+# Fetches requested within this many seconds after a cycle reuse its result
+DEFAULT_MIN_FETCH_INTERVAL = 5
+
 
 class TalentSolarMonitor:
     """TalentSolarMonitor API client."""
@@ -27,13 +57,99 @@ class TalentSolarMonitor:
         username: str = None,
         password: str = None,
         session: ClientSession = None,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        max_concurrent_requests_per_host: int = DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+        discovery_interval: float = DEFAULT_DISCOVERY_INTERVAL,
+        keep_raw_data: bool = False,
+        payload_history_size: int = DEFAULT_PAYLOAD_HISTORY_SIZE,
+        base_url: str = BASE_URL,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_prefetch: int = DEFAULT_PAGE_PREFETCH,
+        time_zone: tzinfo | None = None,
+        data_provider: DataProvider | None = None,
+        inverter_data_provider: InverterDataProvider | None = None,
+        power_station_data_provider: PowerStationDataProvider | None = None,
     ):
-        """Construct the TalentSolarMonitor API client."""
-        self._data_provider = DataProvider(username, password, session)
-        self._inverter_data_provider = InverterDataProvider(self._data_provider)
-        self._power_station_data_provider = PowerStationDataProvider(
-            self._data_provider
+        """Construct the TalentSolarMonitor API client.
+
+        A data_provider, e.g. a ReplayDataProvider, replaces the one
+        created from the other arguments. The inverter and power station
+        data providers can be replaced to use another data source, e.g. the
+        local data providers. If both are replaced, no cloud data provider
+        is created and the client sends no request to the cloud. The power
+        station data is requested in time_zone, the local time zone of the
+        system if None.
+        """
+        if data_provider is None and (
+            inverter_data_provider is None or power_station_data_provider is None
+        ):
+            data_provider = DataProvider(
+                username,
+                password,
+                session,
+                max_concurrent_requests,
+                max_concurrent_requests_per_host,
+                keep_raw_data,
+                payload_history_size,
+                base_url,
+                request_timeout,
+                max_retries,
+                page_size,
+                page_prefetch,
+            )
+        self._data_provider = data_provider
+        self._metrics = (
+            data_provider.metrics if data_provider is not None else ApiMetrics()
+        )
+        self._inverter_data_provider = (
+            inverter_data_provider or InverterDataProvider(self._data_provider)
         )
+        self._power_station_data_provider = (
+            power_station_data_provider
+            or PowerStationDataProvider(self._data_provider, time_zone)
+        )
+        self._discovery_interval = discovery_interval
+        self._last_discovery: float | None = None
+        self._fetch_task: asyncio.Task | None = None
+        self._last_fetch: float | None = None
+
+    @property
+    def data_provider(self) -> DataProvider | None:
+        """Return the cloud data provider of the API client, if any."""
+        return self._data_provider
+
+    @property
+    def inverter_data_provider(self) -> InverterDataProvider:
+        """Return the inverter data provider of the API client."""
+        return self._inverter_data_provider
+
+    @property
+    def token_manager(self) -> TokenManager | None:
+        """Return the token manager of the API client, if it uses the cloud."""
+        if self._data_provider is None:
+            return None
+        return self._data_provider.token_manager
+
+    @property
+    def metrics(self) -> ApiMetrics:
+        """Return the request metrics of the API client."""
+        return self._metrics
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker | None:
+        """Return the circuit breaker guarding the API, if it uses the cloud."""
+        if self._data_provider is None:
+            return None
+        return self._data_provider.circuit_breaker
+
+    @property
+    def recent_payloads(self) -> list[dict]:
+        """Return the most recent API responses, oldest first."""
+        if self._data_provider is None:
+            return []
+        return self._data_provider.recent_payloads
 
     def get_power_stations(self) -> list[PowerStation]:
         """Return the power stations."""
@@ -43,27 +159,201 @@ class TalentSolarMonitor:
         """Return the inverters."""
         return self._inverter_data_provider.inverters
 
-    async def fetch_data(self):
-        """Fetch data from the TalentMonitor."""
-        await self._inverter_data_provider.fetch_data()
-        await self._power_station_data_provider.fetch_data()
+    def get_revisions(self) -> dict[str, int]:
+        """Return the data revision of each inverter and power station."""
+        return {
+            entity.entity_id: entity.revision
+            for entity in [*self.get_inverters(), *self.get_power_stations()]
+        }
+
+    def get_topology(self) -> dict:
+        """Return the known devices and their value keys, without the values."""
+        return {
+            "power_stations": [
+                power_station.snapshot() for power_station in self.get_power_stations()
+            ],
+            "inverters": [inverter.snapshot() for inverter in self.get_inverters()],
+        }
+
+    def restore_topology(self, topology: dict):
+        """Restore the devices of a topology returned by get_topology.
+
+        The restored devices have unknown values until they are fetched.
+        """
+        self._power_station_data_provider.restore(topology.get("power_stations", []))
+        self._inverter_data_provider.restore(topology.get("inverters", []))
+
+    @property
+    def pushes_updates(self) -> bool:
+        """Return true if a data provider pushes device updates."""
+        return bool(self._push_providers())
+
+    def add_update_listener(
+        self, listener: Callable[[Entity], None]
+    ) -> Callable[[], None]:
+        """Call listener with each device changed by pushed data.
+
+        Returns a function removing the listener again.
+        """
+        removers = [
+            provider.add_update_listener(listener)
+            for provider in self._push_providers()
+        ]
+
+        def remove_listener():
+            for remove in removers:
+                remove()
+
+        return remove_listener
 
-    async def fetch_solar_data(self):
-        """Fetch the solar data and return it as json."""
+    def _push_providers(self) -> list:
+        """Return the data providers pushing device updates."""
+        return [
+            provider
+            for provider in (
+                self._inverter_data_provider,
+                self._power_station_data_provider,
+            )
+            if hasattr(provider, "add_update_listener")
+        ]
+
+    def request_discovery(self):
+        """Re-read the device and power station lists on the next fetch."""
+        self._last_discovery = None
+
+    async def fetch_data(self, min_interval: float = 0):
+        """Fetch data from the TalentMonitor.
+
+        The device and power station lists are only re-read once per
+        discovery interval, in between only the details of the known
+        devices are fetched. Concurrent callers share one fetch cycle, and
+        a cycle that completed less than min_interval seconds ago is reused.
+        """
+        if self._fetch_task is None:
+            if (
+                self._last_fetch is not None
+                and time.monotonic() - self._last_fetch < min_interval
+            ):
+                return
+            self._fetch_task = asyncio.ensure_future(self._fetch_cycle())
+            self._fetch_task.add_done_callback(self._fetch_done)
+        await asyncio.shield(self._fetch_task)
+
+    def _fetch_done(self, task: asyncio.Task):
+        """Release the finished fetch cycle."""
+        self._fetch_task = None
+        if not task.cancelled() and task.exception() is None:
+            self._last_fetch = time.monotonic()
+
+    async def _fetch_cycle(self):
+        """Run one fetch cycle and record its duration."""
+        start = time.monotonic()
+        try:
+            await self._fetch_data()
+        finally:
+            self.metrics.record_cycle(time.monotonic() - start)
+
+    async def _fetch_data(self):
+        """Fetch the lists if discovery is due and the details of all devices."""
+        if (
+            self._last_discovery is None
+            or time.monotonic() - self._last_discovery >= self._discovery_interval
+        ):
+            discovered = await asyncio.gather(
+                self._inverter_data_provider.fetch_data(),
+                self._power_station_data_provider.fetch_data(),
+            )
+            # A failed list is read again on the next cycle
+            if all(discovered):
+                self._last_discovery = time.monotonic()
+        else:
+            await asyncio.gather(
+                self._inverter_data_provider.fetch_telemetry(),
+                self._power_station_data_provider.fetch_telemetry(),
+            )
+
+    async def fetch_solar_data(self) -> dict:
+        """Fetch the solar data and return the values of all devices."""
         await self.fetch_data()
+        return {
+            "power_stations": [
+                _entity_data(power_station)
+                for power_station in self.get_power_stations()
+            ],
+            "inverters": [
+                {
+                    **_entity_data(inverter),
+                    "pv": [
+                        {key: value.value for key, value in pv.values.items()}
+                        for pv in inverter.pv
+                    ],
+                    "phases": [
+                        {
+                            "name": phase.name,
+                            **{key: value.value for key, value in phase.values.items()},
+                        }
+                        for phase in inverter.phases
+                    ],
+                }
+                for inverter in self.get_inverters()
+            ],
+        }
 
     async def login(self):
         """Log in to the TalentMonitor API."""
-        await self._data_provider.login()
+        if self._data_provider is not None:
+            await self._data_provider.login()
+
+
+def _entity_data(entity) -> dict:
+    """Return the name and values of an inverter or power station."""
+    return {
+        "entity_id": entity.entity_id,
+        "name": entity.name,
+        "values": {key: value.value for key, value in entity.values.items()},
+    }
 
 
-async def main(username: str, password: str):
-    """Connect to the TalentSolarMonitor API and fetch the solar data."""
-    async with ClientSession() as session:
-        talent_monitor = TalentSolarMonitor(username, password, session)
+async def main(args: argparse.Namespace):
+    """Fetch the solar data from the API or a cassette and print it."""
+    if args.replay:
+        talent_monitor = TalentSolarMonitor(
+            data_provider=ReplayDataProvider(
+                args.replay, speed=args.speed, copies=args.copies
+            )
+        )
+        await _run(talent_monitor, args)
+        return
+
+    async with create_session() as session:
+        talent_monitor = TalentSolarMonitor(args.username, args.password, session)
+        if not args.record:
+            await _run(talent_monitor, args)
+            return
+
+        with CassetteRecorder(args.record) as recorder:
+            recorder.attach(talent_monitor.data_provider)
+            await _run(talent_monitor, args)
+        _LOGGER.info("Recorded %d responses to %s", recorder.responses, args.record)
+
+
+async def _run(talent_monitor: TalentSolarMonitor, args: argparse.Namespace):
+    """Run the requested number of fetch cycles and print the last result."""
+    result = None
+    for cycle in range(args.cycles):
+        if cycle:
+            await asyncio.sleep(args.interval)
+        start = time.monotonic()
         result = await talent_monitor.fetch_solar_data()
-        if result:
-            _LOGGER.info("Solar data received: %s", result)
+        _LOGGER.info(
+            "Cycle %d: %d inverters, %d power stations in %.3f s",
+            cycle + 1,
+            len(result["inverters"]),
+            len(result["power_stations"]),
+            time.monotonic() - start,
+        )
+    if result and not args.quiet:
+        print(json.dumps(result, indent=2))  # noqa: T201
 
 
 if __name__ == "__main__":
@@ -72,6 +362,33 @@ if __name__ == "__main__":
     )
     parser.add_argument("-u", "--username", required=False, help="Username to log in")
     parser.add_argument("-p", "--password", required=False, help="Password to log in")
+    parser.add_argument(
+        "--record", metavar="CASSETTE", help="Record all API responses to a cassette"
+    )
+    parser.add_argument(
+        "--replay", metavar="CASSETTE", help="Serve the API responses from a cassette"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="Replay speed relative to the recorded latencies, 0 replays instantly",
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=1,
+        help="Multiply the replayed devices this many times",
+    )
+    parser.add_argument("--cycles", type=int, default=1, help="Number of fetch cycles")
+    parser.add_argument(
+        "--interval", type=float, default=30, help="Seconds between fetch cycles"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Do not print the fetched data"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging")
     args = parser.parse_args()
 
-    asyncio.run(main(args.username, args.password))
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    asyncio.run(main(args))
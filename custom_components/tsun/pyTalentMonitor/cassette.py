@@ -0,0 +1,153 @@
+"""Record TalentMonitor API responses to a cassette and replay them offline.
+
+A cassette is a gzip compressed file with one JSON object per response:
+the endpoint, the latency in seconds and the payload.
+"""
+
+import asyncio
+from collections import defaultdict
+import gzip
+import json
+import logging
+import re
+from typing import Any
+
+from custom_components.tsun.pyTalentMonitor.data_provider import DataProvider
+from custom_components.tsun.pyTalentMonitor.projection import project
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# Separates the copy number from the GUID of synthetically multiplied devices
+COPY_SEPARATOR = "~"
+GUID_FIELDS = ("deviceGuid", "powerStationGuid")
+_GUID_PARAMETER = re.compile(
+    rf"((?:{'|'.join(GUID_FIELDS)})=[^&{COPY_SEPARATOR}]*){COPY_SEPARATOR}\d+"
+)
+
+
+class CassetteRecorder:
+    """Write the successful responses of a DataProvider to a cassette.
+
+    The file is written synchronously, which is fine for the command line
+    tools this is meant for.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open the cassette for writing."""
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._remove_listener = None
+        self.responses = 0
+
+    def attach(self, data_provider: DataProvider) -> None:
+        """Record the responses of the data provider."""
+        self._remove_listener = data_provider.add_response_listener(self.record)
+
+    def record(self, endpoint: str, latency: float, payload: Any) -> None:
+        """Append a response to the cassette."""
+        self._file.write(
+            json.dumps(
+                {"endpoint": endpoint, "latency": round(latency, 4), "payload": payload},
+                separators=(",", ":"),
+            )
+        )
+        self._file.write("\n")
+        self.responses += 1
+
+    def close(self) -> None:
+        """Stop recording and close the cassette."""
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
+        self._file.close()
+
+    def __enter__(self) -> "CassetteRecorder":
+        """Return the recorder."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the cassette."""
+        self.close()
+
+
+def load_cassette(path: str) -> dict[str, list[tuple[float, Any]]]:
+    """Return the latencies and payloads of a cassette grouped by endpoint."""
+    responses: dict[str, list[tuple[float, Any]]] = defaultdict(list)
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            responses[record["endpoint"]].append(
+                (record["latency"], record["payload"])
+            )
+    return dict(responses)
+
+
+class ReplayDataProvider(DataProvider):
+    """DataProvider serving the responses of a cassette instead of the API.
+
+    The responses of each endpoint are served in recorded order and start
+    over when exhausted. Latencies are replayed divided by speed, a speed of
+    0 answers immediately. With copies > 1 every device and power station
+    of the list responses is repeated with a GUID suffix, so a small
+    recording can be scaled up to a large fleet.
+    """
+
+    def __init__(
+        self,
+        cassette: str | dict[str, list[tuple[float, Any]]],
+        speed: float = 0,
+        copies: int = 1,
+        **kwargs,
+    ) -> None:
+        """Initialize the replay data provider."""
+        super().__init__("replay", "replay", None, **kwargs)
+        self._responses = (
+            load_cassette(cassette) if isinstance(cassette, str) else cassette
+        )
+        self._positions: dict[str, int] = defaultdict(int)
+        self._speed = speed
+        self._copies = max(1, copies)
+
+    async def _async_login(self) -> str:
+        """Return a token without contacting the API."""
+        return "replay"
+
+    async def get_data(self, endpoint, fields: frozenset[str] | None = None):
+        """Return the next recorded response of the endpoint."""
+        recorded_endpoint = _GUID_PARAMETER.sub(r"\1", endpoint)
+        responses = self._responses.get(recorded_endpoint)
+        if not responses:
+            _LOGGER.error("No recorded response for %s", endpoint)
+            return None
+
+        position = self._positions[recorded_endpoint]
+        self._positions[recorded_endpoint] = (position + 1) % len(responses)
+        latency, payload = responses[position]
+        if self._speed > 0:
+            await asyncio.sleep(latency / self._speed)
+        if self._copies > 1:
+            payload = self._multiply_rows(payload)
+        fields = self._projection(fields)
+        if fields is not None:
+            payload = project(payload, fields)
+        self._record_response(endpoint, latency, payload)
+        return payload
+
+    def _multiply_rows(self, payload: Any) -> Any:
+        """Repeat the rows of a list response with suffixed GUIDs."""
+        if not isinstance(payload, dict) or not isinstance(payload.get("rows"), list):
+            return payload
+
+        rows = []
+        for copy in range(self._copies):
+            for row in payload["rows"]:
+                if copy and isinstance(row, dict):
+                    row = {
+                        **row,
+                        **{
+                            field: f"{row[field]}{COPY_SEPARATOR}{copy}"
+                            for field in GUID_FIELDS
+                            if field in row
+                        },
+                    }
+                rows.append(row)
+        return {**payload, "rows": rows, "total": len(rows)}
@@ -1,79 +1,807 @@
 """Data Provider for accessing the TalentMonitor API."""
+import asyncio
+import base64
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+import json
 import logging
+import math
 import os
+import time
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit
 
-from aiohttp import ClientSession
+from aiohttp import (
+    ClientError,
+    ClientResponse,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+)
+
+from custom_components.tsun.pyTalentMonitor import projection
+from custom_components.tsun.pyTalentMonitor.metrics import ApiMetrics
+from custom_components.tsun.pyTalentMonitor.retry import (
+    DEFAULT_BACKOFF_MAX,
+    DEFAULT_MAX_RETRIES,
+    RETRYABLE_STATUS_CODES,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    parse_retry_after,
+)
 
 # Configure logging
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 BASE_URL = "https://www.talent-monitoring.com/prod-api"
 
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST = 4
+# Number of recent API responses kept for diagnostics, 0 disables the buffer
+DEFAULT_PAYLOAD_HISTORY_SIZE = 0
+# Seconds a single request may take, including reading the response
+DEFAULT_REQUEST_TIMEOUT = 20
+# Rows requested per page of the device lists and pages fetched ahead
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_PAGE_PREFETCH = 2
+# Hard limit of the pages read from a list
+MAX_PAGES = 100
+
+# Refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 60
+# Observed token lifetimes must agree within this fraction to be used
+TOKEN_LIFETIME_TOLERANCE = 0.2
+
+
+class LazyJson:
+    """Serialize data to JSON only when the log record is actually emitted."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Any) -> None:
+        """Initialize with the data to serialize."""
+        self._data = data
+
+    def __str__(self) -> str:
+        """Return the data as JSON."""
+        return json.dumps(self._data)
+
+
+def decode_token_expiry(token: str) -> float | None:
+    """Return the expiry (epoch seconds) encoded in a JWT token, if any."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """Manage the bearer token of the TalentMonitor API.
+
+    Concurrent refreshes are coalesced into a single login and the token is
+    refreshed ahead of its expiry. The expiry is taken from the JWT ``exp``
+    claim; tokens without one get the lifetime observed on previous 401s.
+    """
+
+    def __init__(self, login: Callable[[], Awaitable[str]]) -> None:
+        """Initialize the token manager."""
+        self._login = login
+        self._lock = asyncio.Lock()
+        self._token: str | None = None
+        # Time of the login that returned the token, None if it was restored
+        self._logged_in_at: float | None = None
+        self._expires_at: float | None = None
+        self._refresh_at: float | None = None
+        self._observed_lifetime: float | None = None
+        self._lifetime_candidate: float | None = None
+        self._listeners: list[Callable[[str | None, float | None], None]] = []
+
+    def add_listener(
+        self, listener: Callable[[str | None, float | None], None]
+    ) -> Callable[[], None]:
+        """Call listener with token and expiry after each login.
+
+        Returns a function removing the listener again.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @property
+    def token(self) -> str | None:
+        """Return the current token."""
+        return self._token
+
+    @property
+    def expires_at(self) -> float | None:
+        """Return the expiry of the current token in epoch seconds, if known."""
+        return self._expires_at
+
+    @property
+    def is_valid(self) -> bool:
+        """Return true if the token exists and is not about to expire."""
+        if not self._token:
+            return False
+        if self._refresh_at is None:
+            return True
+        return time.time() < self._refresh_at
+
+    def set_token(self, token: str | None, expires_at: float | None = None) -> None:
+        """Set the token and derive its expiry."""
+        now = time.time()
+        self._token = token
+        self._logged_in_at = None
+        if expires_at is None and token:
+            expires_at = decode_token_expiry(token)
+        if expires_at is None and token and self._observed_lifetime:
+            expires_at = now + self._observed_lifetime
+        self._expires_at = expires_at
+        self._refresh_at = None
+        if expires_at is not None:
+            # Short-lived tokens are refreshed halfway through their lifetime
+            margin = min(TOKEN_REFRESH_MARGIN, (expires_at - now) / 2)
+            self._refresh_at = expires_at - max(margin, 0)
+
+    def restore_token(self, token: str, expires_at: float | None) -> bool:
+        """Restore a previously persisted token if it is still usable."""
+        if expires_at is not None and time.time() >= expires_at - TOKEN_REFRESH_MARGIN:
+            return False
+        self.set_token(token, expires_at)
+        return True
+
+    async def async_login(self) -> str:
+        """Log in unconditionally and return the new token."""
+        async with self._lock:
+            return await self._async_login_locked()
+
+    async def _async_login_locked(self) -> str:
+        """Log in and inform the listeners, the lock must be held."""
+        self.set_token(await self._login())
+        self._logged_in_at = time.time()
+        for listener in list(self._listeners):
+            listener(self._token, self._expires_at)
+        return self._token
+
+    async def async_get_token(self) -> str:
+        """Return a valid token, logging in if necessary."""
+        if self.is_valid:
+            return self._token
+        return await self.async_refresh()
+
+    async def async_refresh(self, rejected_token: str | None = None) -> str:
+        """Refresh the token, sharing a single login between concurrent callers.
+
+        If rejected_token is given, the token was refused by the API and is
+        replaced unless another caller already did so.
+        """
+        async with self._lock:
+            if rejected_token is None:
+                if self.is_valid:
+                    return self._token
+            elif self._token != rejected_token:
+                return self._token
+            else:
+                self._learn_lifetime()
+
+            return await self._async_login_locked()
+
+    def _learn_lifetime(self) -> None:
+        """Remember how long a token without expiry claim was accepted.
+
+        Only tokens of a login in this process are observed, a restored
+        token may have been issued long before. A lifetime is used once two
+        consecutive rejections agree on it, so a stray 401 does not shorten
+        the refresh interval for good.
+        """
+        if (
+            self._logged_in_at is None
+            or decode_token_expiry(self._token or "") is not None
+        ):
+            return
+        lifetime = time.time() - self._logged_in_at
+        if lifetime <= 2 * TOKEN_REFRESH_MARGIN:
+            return
+        candidate, self._lifetime_candidate = self._lifetime_candidate, lifetime
+        _LOGGER.debug("Observed token lifetime of %d seconds", lifetime)
+        if (
+            candidate is not None
+            and abs(lifetime - candidate) <= TOKEN_LIFETIME_TOLERANCE * candidate
+        ):
+            self._observed_lifetime = min(lifetime, candidate)
+
+
 class DataProvider:
     """Data provider accessing the TalentMonitor API."""
 
     def __init__(
-        self,  username: str, password: str, session: ClientSession
+        self,
+        username: str,
+        password: str,
+        session: ClientSession,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        max_concurrent_requests_per_host: int = DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+        keep_raw_data: bool = False,
+        payload_history_size: int = DEFAULT_PAYLOAD_HISTORY_SIZE,
+        base_url: str = BASE_URL,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_prefetch: int = DEFAULT_PAGE_PREFETCH,
     ):
         """Initialize the data provider."""
-        self._url = BASE_URL
+        self._url = base_url
         self._username = username or os.environ.get("PYTALENT_USERNAME")
         self._password = password or os.environ.get("PYTALENT_PASSWORD")
         self._session = session
-        self._token = None
+        self.keep_raw_data = keep_raw_data
+        self.metrics = ApiMetrics()
+        self._payload_history: deque[dict] | None = (
+            deque(maxlen=payload_history_size) if payload_history_size > 0 else None
+        )
+        self._token_manager = TokenManager(self._async_login)
+        self._request_semaphore = asyncio.Semaphore(max(1, max_concurrent_requests))
+        self._max_concurrent_requests_per_host = max(
+            1, max_concurrent_requests_per_host
+        )
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._request_timeout = ClientTimeout(total=request_timeout)
+        self._max_retries = max(0, max_retries)
+        self._page_size = max(1, page_size)
+        self._page_prefetch = max(0, page_prefetch)
+        self._circuit_breaker = CircuitBreaker()
+        self._response_listeners: list[Callable[[str, float, Any], None]] = []
 
-    async def login(self):
-        """Log in using the given credentials."""
-        login_data = {"username": self._username, "password": self._password}
-        response = await self._session.post(f"{self._url}/login", json=login_data)
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Return the semaphore limiting the in-flight requests for the host of url."""
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                self._max_concurrent_requests_per_host
+            )
+        return self._host_semaphores[host]
+
+    @asynccontextmanager
+    async def _request_slot(self, url: str):
+        """Hold a slot of the global and the per-host request limits."""
+        async with self._request_semaphore, self._host_semaphore(url):
+            yield
+
+    @property
+    def token_manager(self) -> TokenManager:
+        """Return the token manager."""
+        return self._token_manager
+
+    def add_response_listener(
+        self, listener: Callable[[str, float, Any], None]
+    ) -> Callable[[], None]:
+        """Call listener with endpoint, latency and payload of each successful response.
+
+        Returns a function removing the listener again.
+        """
+        self._response_listeners.append(listener)
+        return lambda: self._response_listeners.remove(listener)
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """Return the circuit breaker guarding the API."""
+        return self._circuit_breaker
+
+    @property
+    def recent_payloads(self) -> list[dict]:
+        """Return the most recent API responses, oldest first."""
+        if self._payload_history is None:
+            return []
+        return list(self._payload_history)
+
+    async def _async_login(self) -> str:
+        """Log in using the given credentials and return the token.
+
+        Responses with a retryable status are retried like data requests and
+        raise ClientResponseError once the retries are exhausted. Only a
+        refusal of the credentials raises AuthenticationError.
+        """
+        attempt = 0
+        while True:
+            response = await self._async_post_login()
+            if response.status not in RETRYABLE_STATUS_CODES:
+                break
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                raise ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message="Login failed",
+                    headers=response.headers,
+                )
+            _LOGGER.debug(
+                "Login failed (status code %s), retrying in %.1f seconds",
+                response.status,
+                delay,
+            )
+            self.metrics.record_retry("login")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        if response.status not in (200, 401, 403):
+            raise ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message="Login failed",
+                headers=response.headers,
+            )
         response_data = await response.json()
         if "token" in response_data:
-            self._token = response_data["token"]
-            _LOGGER.debug("Login successful - received token: %s", self._token)
-        else:
-            _LOGGER.error("Login failed. Token missing in response. Got status code %s", response.status)
-            raise AuthenticationError("Authentication failed")
+            _LOGGER.debug("Login successful - received token: %s", response_data["token"])
+            return response_data["token"]
 
-    async def refresh_token(self):
+        _LOGGER.error("Login failed. Token missing in response. Got status code %s", response.status)
+        raise AuthenticationError("Authentication failed")
+
+    async def _async_post_login(self) -> ClientResponse:
+        """Send the login request, read the body and record the metrics."""
+        login_data = {"username": self._username, "password": self._password}
+        start = time.monotonic()
+        try:
+            response = await self._session.post(
+                f"{self._url}/login", json=login_data, timeout=self._request_timeout
+            )
+            body = await response.read()
+        except Exception:
+            self.metrics.record_request("login", time.monotonic() - start, None)
+            raise
+        self.metrics.record_request(
+            "login", time.monotonic() - start, response.status, len(body)
+        )
+        return response
+
+    async def login(self):
+        """Log in using the given credentials."""
+        await self._token_manager.async_login()
+
+    async def refresh_token(self, rejected_token: str | None = None):
         """Refresh the token."""
         _LOGGER.debug("Token expired. Refreshing token...")
-        self.login()
+        return await self._token_manager.async_refresh(rejected_token)
 
-    async def get_data(self, endpoint):
-        """Get data from the given endpoint."""
-        if not self._token:
-            await self.login()
-        headers = {"Authorization": f"Bearer {self._token}"}
-        response = await self._session.get(f"{self._url}/{endpoint}", headers=headers)
-        if response.status == 401:  # Unauthorized, token might be expired
-            self.refresh_token()
-            headers["Authorization"] = f"Bearer {self._token}"
-            response = await self._session.get(f"{self._url}/{endpoint}", headers=headers)
-
-        if response.status == 200:
-            return await response.json()
+    async def _async_get(self, endpoint: str, token: str) -> ClientResponse:
+        """Issue a GET request, read the body and record the metrics."""
+        headers = {"Authorization": f"Bearer {token}"}
+        start = time.monotonic()
+        try:
+            response = await self._session.get(
+                f"{self._url}/{endpoint}",
+                headers=headers,
+                timeout=self._request_timeout,
+            )
+            body = await response.read()
+        except Exception:
+            self.metrics.record_request(endpoint, time.monotonic() - start, None)
+            raise
+        self.metrics.record_request(
+            endpoint, time.monotonic() - start, response.status, len(body)
+        )
+        return response
+
+    def _projection(self, fields: frozenset[str] | None) -> frozenset[str] | None:
+        """Return the fields to keep of a response, None to keep all.
+
+        The full payloads are kept while they are retained for debugging
+        or passed to response listeners, e.g. a cassette recorder.
+        """
+        if (
+            self.keep_raw_data
+            or self._payload_history is not None
+            or self._response_listeners
+        ):
+            return None
+        return fields
+
+    async def get_data(self, endpoint, fields: frozenset[str] | None = None):
+        """Get data from the given endpoint.
+
+        Timeouts, network errors, 429 and 5xx responses are retried with
+        exponential backoff and jitter, honouring Retry-After. Returns None
+        if the request failed for good and raises CircuitOpenError while the
+        API is considered down. If fields are given, the objects of the
+        response only contain these fields.
+        """
+        trial = self._circuit_breaker.before_request()
+        try:
+            return await self._async_get_data(endpoint, fields)
+        except AuthenticationError:
+            # The API answered, the credentials were refused
+            self._circuit_breaker.record_success()
+            raise
+        except Exception:
+            # E.g. the login failed with a network error
+            self._circuit_breaker.record_failure()
+            raise
+        finally:
+            if trial:
+                # A cancelled trial hands over to the next request
+                self._circuit_breaker.release_trial()
+
+    async def _async_get_data(self, endpoint, fields: frozenset[str] | None):
+        """Get data from the endpoint, retrying failed requests."""
+        token = await self._token_manager.async_get_token()
+        url = f"{self._url}/{endpoint}"
+        token_refreshed = False
+        attempt = 0
+        while True:
+            response = None
+            start = time.monotonic()
+            try:
+                async with self._request_slot(url):
+                    response = await self._async_get(endpoint, token)
+            except (asyncio.TimeoutError, ClientError) as err:
+                error = repr(err)
+            else:
+                error = f"status code {response.status}"
+
+            if response is not None and response.status == 200:
+                self._circuit_breaker.record_success()
+                try:
+                    response_data = projection.loads(
+                        await response.read(), self._projection(fields)
+                    )
+                except ValueError:
+                    _LOGGER.error("Invalid JSON response from %s", endpoint)
+                    return None
+                self._record_response(
+                    endpoint, time.monotonic() - start, response_data
+                )
+                return response_data
+
+            if (
+                response is not None
+                and response.status == 401
+                and not token_refreshed
+            ):  # Unauthorized, token might be expired
+                token = await self.refresh_token(token)
+                token_refreshed = True
+                self.metrics.record_retry(endpoint)
+                continue
+
+            if response is not None and response.status not in RETRYABLE_STATUS_CODES:
+                # The API answered, so it is available even if the request is refused
+                self._circuit_breaker.record_success()
+                _LOGGER.error("Failed to fetch %s: %s", endpoint, error)
+                return None
+
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                self._circuit_breaker.record_failure()
+                _LOGGER.error(
+                    "Failed to fetch %s after %d attempts: %s",
+                    endpoint,
+                    attempt + 1,
+                    error,
+                )
+                return None
+
+            _LOGGER.debug(
+                "Fetching %s failed (%s), retrying in %.1f seconds",
+                endpoint,
+                error,
+                delay,
+            )
+            self.metrics.record_retry(endpoint)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def iter_pages(
+        self,
+        endpoint: str,
+        fields: frozenset[str] | None = None,
+        key: str | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield the rows of a paged list endpoint page by page.
+
+        The pages are requested with the pageNum and pageSize parameters of
+        the API. Once the first page reported the total, up to page_prefetch
+        following pages are fetched while the caller processes the current
+        one. Paging stops after the last page, an empty page, MAX_PAGES
+        pages or, if key is given, a page without new values of the key
+        field, e.g. because the API ignores the paging parameters. Raises
+        IncompleteListError if a page could not be fetched.
+        """
+        separator = "&" if "?" in endpoint else "?"
+
+        def fetch_page(page: int):
+            return self.get_data(
+                f"{endpoint}{separator}pageNum={page}&pageSize={self._page_size}",
+                fields,
+            )
+
+        def page_rows(data, page: int) -> list:
+            if not data or not isinstance(data.get("rows"), list):
+                raise IncompleteListError(f"Fetching page {page} of {endpoint} failed")
+            return data["rows"]
+
+        data = await fetch_page(1)
+        rows = page_rows(data, 1)
+        total = data.get("total")
+        if not isinstance(total, int) or len(rows) >= total:
+            # Without a total, the pages are fetched until a short page
+            last_page = 1 if isinstance(total, int) or len(rows) < self._page_size else 2
         else:
-            _LOGGER.error("Failed to fetch data. Status Code: %s", response.status)
+            last_page = min(math.ceil(total / self._page_size), MAX_PAGES)
+
+        seen_keys: set = set()
+        pending: deque[asyncio.Task] = deque()
+        page = 1
+        next_page = 2
+        try:
+            while True:
+                if key is not None:
+                    new_keys = {
+                        row.get(key) for row in rows if isinstance(row, dict)
+                    } - seen_keys
+                    if page > 1 and not new_keys:
+                        _LOGGER.debug("Page %d of %s has no new rows", page, endpoint)
+                        return
+                    seen_keys |= new_keys
+
+                while next_page <= last_page and len(pending) < self._page_prefetch:
+                    pending.append(asyncio.ensure_future(fetch_page(next_page)))
+                    next_page += 1
+                yield rows
+
+                if not pending and next_page <= last_page:
+                    pending.append(asyncio.ensure_future(fetch_page(next_page)))
+                    next_page += 1
+                if not pending:
+                    return
+                page += 1
+                rows = page_rows(await pending.popleft(), page)
+                if not rows:
+                    return
+                if not isinstance(total, int) and len(rows) >= self._page_size:
+                    last_page = min(next_page, MAX_PAGES)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _record_response(self, endpoint: str, latency: float, response_data) -> None:
+        """Keep a successful response for diagnostics and the response listeners."""
+        if self._payload_history is not None:
+            self._payload_history.append(
+                {
+                    "time": time.time(),
+                    "endpoint": endpoint,
+                    "payload": response_data,
+                }
+            )
+        for listener in list(self._response_listeners):
+            listener(endpoint, latency, response_data)
+
+    def _retry_delay(self, response: ClientResponse | None, attempt: int) -> float | None:
+        """Return the delay before retrying a failed request, None to give up."""
+        if attempt >= self._max_retries:
             return None
+        delay = None
+        if response is not None:
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = backoff_delay(attempt)
+        if delay > DEFAULT_BACKOFF_MAX:
+            return None
+        return delay
+
+
+class DetailFetches:
+    """Fetch the details of devices as they are discovered, once per device.
+
+    The fetches run concurrently with the discovery of the following pages.
+    """
+
+    def __init__(self, fetch: Callable[[Any], Awaitable[None]]) -> None:
+        """Initialize with the coroutine function fetching one device."""
+        self._fetch = fetch
+        self._tasks: dict[str, asyncio.Future] = {}
+        self._entities: list[Entity] = []
+
+    def start(self, entities: list["Entity"]) -> None:
+        """Start fetching the devices which are not fetched yet."""
+        for entity in entities:
+            if entity.entity_id not in self._tasks:
+                self._tasks[entity.entity_id] = asyncio.ensure_future(
+                    self._fetch(entity)
+                )
+                self._entities.append(entity)
+
+    async def cancel(self) -> None:
+        """Cancel the running fetches."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def gather(self) -> None:
+        """Wait for all fetches, see raise_fatal_errors."""
+        results = await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        raise_fatal_errors(results, self._entities)
+
+
+def raise_fatal_errors(results: list, entities: list["Entity"]) -> None:
+    """Log the failed fetches of single devices and re-raise fatal errors.
+
+    The device fetches of a cycle are gathered with return_exceptions, so
+    one failing device does not prevent the others from updating. Errors
+    affecting all devices, like an open circuit or failed authentication,
+    still fail the whole cycle after all failed devices are recorded.
+    """
+    fatal_error = None
+    for result, entity in zip(results, entities):
+        if not isinstance(result, Exception):
+            continue
+        entity.record_failure()
+        if isinstance(result, (CircuitOpenError, AuthenticationError)):
+            fatal_error = fatal_error or result
+        else:
+            _LOGGER.warning("Failed to fetch %s: %r", entity.name, result)
+    if fatal_error is not None:
+        raise fatal_error
+
+
+# Fields of the API payloads that are exposed as sensors, the keys of
+# SENSOR_TYPES in sensor.py (see tests/test_sensor.py)
+SENSOR_KEYS = (
+    "totalActivePower",
+    "ratedPower",
+    "dayEnergy",
+    "monthEnergy",
+    "yearEnergy",
+    "lastDataUpdateTime",
+    "inverterTemp",
+    "activePower",
+    "power",
+    "current",
+    "voltage",
+    "frequency",
+)
+# Fields of the response envelope and the paged lists
+RESPONSE_KEYS = ("code", "msg", "data", "rows", "total")
+
+
+def response_fields(*keys: str) -> frozenset[str]:
+    """Return the projection of a detail response read by parse_values.
+
+    Includes the response envelope, the sensor fields with their named
+    variants and the given additional keys.
+    """
+    return frozenset(
+        (
+            *RESPONSE_KEYS,
+            *SENSOR_KEYS,
+            *(f"{key}Named" for key in SENSOR_KEYS),
+            *keys,
+        )
+    )
+
+
+class SensorValue(NamedTuple):
+    """Value of a data field together with the unit reported by the API."""
+
+    value: Any
+    unit: str | None
+
+
+def parse_values(data: dict) -> dict[str, SensorValue]:
+    """Parse the sensor fields of a payload into a value/unit table.
+
+    The API reports many values twice, e.g. ``power`` and ``powerNamed``
+    (``"1.2 kW"``). The named variant wins as it carries the unit.
+    """
+    values: dict[str, SensorValue] = {}
+    for key in SENSOR_KEYS:
+        if key not in data:
+            continue
+
+        value = data[key]
+        unit = None
+        value_with_unit = data.get(key + "Named")
+        if value_with_unit and isinstance(value_with_unit, str):
+            value_split = value_with_unit.split(" ")
+            if len(value_split) == 2:
+                value, unit = value_split
+        values[key] = SensorValue(value, unit)
+    return values
+
+
+def restore_values(keys) -> dict[str, SensorValue]:
+    """Return a value table with unknown values for the given keys."""
+    return {key: SensorValue(None, None) for key in keys}
+
 
 class Entity:
-    """Base class for TalentMonitor entities."""
+    """Base class for TalentMonitor entities.
+
+    Only the fields listed in SENSOR_KEYS are kept from the API payload. The
+    raw payload is retained in raw_data if requested for debugging. If a
+    fetch fails, the last good values are kept and counted as stale.
+    """
+
+    __slots__ = (
+        "entity_id",
+        "name",
+        "values",
+        "raw_data",
+        "last_success",
+        "failures",
+        "_revision",
+    )
 
     def __init__(self, entity_id: str, name: str) -> None:
         """Initialize the entity."""
         self.entity_id = entity_id
         self.name = name
-        self._data = {}
+        self.values: dict[str, SensorValue] = {}
+        self.raw_data: dict | None = None
+        # Epoch seconds of the last successful fetch
+        self.last_success: float | None = None
+        # Failed fetches since the last successful one
+        self.failures = 0
+        self._revision = 0
 
     @property
-    def data(self):
-        """Return the data of the entity."""
-        return self._data
+    def revision(self) -> int:
+        """Return a counter which is increased whenever the data changes."""
+        return self._revision
+
+    @property
+    def stale(self) -> bool:
+        """Return true if the values are left over from an earlier fetch."""
+        return self.failures > 0
+
+    def age(self, now: float | None = None) -> float | None:
+        """Return the seconds since the last successful fetch."""
+        if self.last_success is None:
+            return None
+        return (now if now is not None else time.time()) - self.last_success
+
+    def update(self, data: dict, keep_raw_data: bool = False) -> None:
+        """Update the entity from an API payload."""
+        self.raw_data = data if keep_raw_data else None
+        self.last_success = time.time()
+        self.failures = 0
+        if self._apply(data):
+            self._revision += 1
+
+    def record_failure(self) -> None:
+        """Record that fetching the entity failed, keeping the last values."""
+        self.failures += 1
+
+    def snapshot(self) -> dict:
+        """Return the topology of the entity, without the values."""
+        return {
+            "entity_id": self.entity_id,
+            "name": self.name,
+            "keys": list(self.values),
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """Restore the topology from a snapshot, the values remain unknown."""
+        self.values = restore_values(snapshot.get("keys", ()))
+
+    def _apply(self, data: dict) -> bool:
+        """Apply the payload and return true if anything changed."""
+        values = parse_values(data)
+        changed = values != self.values
+        self.values = values
+        return changed
+
+
+class IncompleteListError(Exception):
+    """Raised if a page of a device list could not be fetched."""
 
-    @data.setter
-    def data(self, data):
-        """Set the data of the entity."""
-        self._data = data
 
 class AuthenticationError(Exception):
     """AuthenticationError when connecting to the Talent API."""
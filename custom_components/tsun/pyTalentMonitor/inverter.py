@@ -1,20 +1,185 @@
 """TalentMonitor Inverter."""
 
-import json
+from collections.abc import Callable
 import logging
 
-from custom_components.tsun.pyTalentMonitor.data_provider import DataProvider, Entity
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    RESPONSE_KEYS,
+    DataProvider,
+    DetailFetches,
+    Entity,
+    IncompleteListError,
+    LazyJson,
+    SensorValue,
+    parse_values,
+    response_fields,
+    restore_values,
+)
 
 # Configure logging
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
+# Fields read from the inverter list and the inverter details
+INVERTER_LIST_FIELDS = frozenset((*RESPONSE_KEYS, "deviceGuid"))
+INVERTER_INFO_FIELDS = response_fields(
+    "nameOfManufacturer",
+    "model",
+    "serialNumber",
+    "firmwareVersion1",
+    "pvCount",
+    "pv",
+    "acPhaseCount",
+    "acPhaseExpress",
+    "phase",
+)
+
+
+class PvChannel:
+    """A pv input (panel) of an inverter."""
+
+    __slots__ = ("index", "values")
+
+    def __init__(self, index: int, values: dict[str, SensorValue]) -> None:
+        """Initialize the pv channel."""
+        self.index = index
+        self.values = values
+
+    def __eq__(self, other) -> bool:
+        """Return true if both channels hold the same values."""
+        return (
+            isinstance(other, PvChannel)
+            and self.index == other.index
+            and self.values == other.values
+        )
+
+
+class AcPhase:
+    """An AC output phase of an inverter."""
+
+    __slots__ = ("index", "name", "values")
+
+    def __init__(self, index: int, name: str, values: dict[str, SensorValue]) -> None:
+        """Initialize the AC phase."""
+        self.index = index
+        self.name = name
+        self.values = values
+
+    def __eq__(self, other) -> bool:
+        """Return true if both phases hold the same values."""
+        return (
+            isinstance(other, AcPhase)
+            and self.index == other.index
+            and self.name == other.name
+            and self.values == other.values
+        )
+
 
 class Inverter(Entity):
     """Class for TalentMonitor inverter."""
 
+    __slots__ = (
+        "manufacturer",
+        "model",
+        "serial_number",
+        "firmware_version",
+        "pv",
+        "phases",
+    )
+
     def __init__(self, entity_id: str, name: str) -> None:
         """Initialize the inverter."""
         super().__init__(entity_id, name)
+        self.manufacturer: str | None = None
+        self.model: str | None = None
+        self.serial_number: str | None = None
+        self.firmware_version: str | None = None
+        self.pv: tuple[PvChannel, ...] = ()
+        self.phases: tuple[AcPhase, ...] = ()
+
+    def snapshot(self) -> dict:
+        """Return the topology of the inverter, without the values."""
+        return {
+            **super().snapshot(),
+            "manufacturer": self.manufacturer,
+            "model": self.model,
+            "serial_number": self.serial_number,
+            "firmware_version": self.firmware_version,
+            "pv": [list(pv.values) for pv in self.pv],
+            "phases": [
+                {"name": phase.name, "keys": list(phase.values)}
+                for phase in self.phases
+            ],
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """Restore the topology from a snapshot, the values remain unknown."""
+        super().restore(snapshot)
+        self.manufacturer = snapshot.get("manufacturer")
+        self.model = snapshot.get("model")
+        self.serial_number = snapshot.get("serial_number")
+        self.firmware_version = snapshot.get("firmware_version")
+        self.pv = tuple(
+            PvChannel(index, restore_values(keys))
+            for index, keys in enumerate(snapshot.get("pv", ()))
+        )
+        self.phases = tuple(
+            AcPhase(index, phase.get("name"), restore_values(phase.get("keys", ())))
+            for index, phase in enumerate(snapshot.get("phases", ()))
+        )
+
+    def _apply(self, data: dict) -> bool:
+        """Apply the payload including device info, pv channels and phases."""
+        changed = super()._apply(data)
+
+        device_info = (
+            data.get("nameOfManufacturer"),
+            data.get("model"),
+            data.get("serialNumber"),
+            data.get("firmwareVersion1"),
+        )
+        if device_info != (
+            self.manufacturer,
+            self.model,
+            self.serial_number,
+            self.firmware_version,
+        ):
+            (
+                self.manufacturer,
+                self.model,
+                self.serial_number,
+                self.firmware_version,
+            ) = device_info
+            changed = True
+
+        pv = ()
+        if "pvCount" in data:
+            # it seems pvCount is not set correctly as it is set to 3 when there are only 2 panels, subtracting 1 is a solution for now but might result in a problem at some point
+            pv_data = (data.get("pv") or [])[: max(data["pvCount"] - 1, 0)]
+            pv = tuple(
+                PvChannel(index, parse_values(values))
+                for index, values in enumerate(pv_data)
+            )
+        if pv != self.pv:
+            self.pv = pv
+            changed = True
+
+        phases = ()
+        if "acPhaseCount" in data:
+            phase_data = (data.get("phase") or [])[: max(data["acPhaseCount"], 0)]
+            phase_names = (data.get("acPhaseExpress") or "").split(",")
+            phases = tuple(
+                AcPhase(
+                    index,
+                    phase_names[index] if index < len(phase_names) else str(index),
+                    parse_values(values),
+                )
+                for index, values in enumerate(phase_data)
+            )
+        if phases != self.phases:
+            self.phases = phases
+            changed = True
+
+        return changed
 
 
 class InverterDataProvider:
@@ -34,40 +199,91 @@ class InverterDataProvider:
 
         return result
 
-    async def fetch_data(self):
-        """Fetch the data of the inverter."""
-        data = await self._data_provider.get_data(
-            endpoint="tools/device/selectDeviceInverter"
-        )
-        if data and "rows" in data:
-            for index, inverter_data in enumerate(data["rows"], start=1):
-                if "deviceGuid" in inverter_data:
-                    device_guid = inverter_data["deviceGuid"]
-                    inverter_name = (
-                        "Inverter"  # TODO get a better name from inverter_data
-                    )
-
-                    _LOGGER.debug(
-                        "Data for inverter GUID %s: %s",
-                        device_guid,
-                        json.dumps(inverter_data),
-                    )
-
-                    if device_guid not in self._inverters:
-                        self._inverters[device_guid] = Inverter(
-                            device_guid, inverter_name + " " + str(index)
+    def restore(self, snapshots: list[dict]):
+        """Restore inverters from topology snapshots until they are discovered."""
+        for snapshot in snapshots:
+            device_guid = snapshot["entity_id"]
+            if device_guid not in self._inverters:
+                inverter = Inverter(device_guid, snapshot["name"])
+                inverter.restore(snapshot)
+                self._inverters[device_guid] = inverter
+
+    async def fetch_data(self) -> bool:
+        """Discover the inverters and fetch their details as each page arrives.
+
+        Returns true if the list of inverters was read completely.
+        """
+        fetches = DetailFetches(self._fetch_inverter_details)
+        try:
+            discovered = await self.discover(fetches.start)
+        except BaseException:
+            await fetches.cancel()
+            raise
+        # Inverters known from an earlier discovery or the topology
+        fetches.start(self.inverters)
+        await fetches.gather()
+        return discovered
+
+    async def discover(
+        self, page_listener: Callable[[list[Inverter]], None] | None = None
+    ) -> bool:
+        """Fetch the list of inverters, adding them as each page arrives.
+
+        page_listener is called with the inverters of each page. Returns
+        true if the list was read completely.
+        """
+        index = 0
+        try:
+            async for rows in self._data_provider.iter_pages(
+                "tools/device/selectDeviceInverter", INVERTER_LIST_FIELDS, "deviceGuid"
+            ):
+                page = []
+                for inverter_data in rows:
+                    index += 1
+                    if "deviceGuid" in inverter_data:
+                        device_guid = inverter_data["deviceGuid"]
+                        inverter_name = (
+                            "Inverter"  # TODO get a better name from inverter_data
+                        )
+
+                        _LOGGER.debug(
+                            "Data for inverter GUID %s: %s",
+                            device_guid,
+                            LazyJson(inverter_data),
                         )
 
-                    inverter = self._inverters[device_guid]
+                        if device_guid not in self._inverters:
+                            self._inverters[device_guid] = Inverter(
+                                device_guid, inverter_name + " " + str(index)
+                            )
+                        page.append(self._inverters[device_guid])
+                if page_listener is not None:
+                    page_listener(page)
+        except IncompleteListError as err:
+            _LOGGER.warning("Discovering the inverters failed: %s", err)
+            return False
+        return True
+
+    async def fetch_telemetry(self):
+        """Fetch the details of the known inverters."""
+        fetches = DetailFetches(self._fetch_inverter_details)
+        fetches.start(self.inverters)
+        await fetches.gather()
 
-                    inverter_info = await self._data_provider.get_data(
-                        endpoint=f"tools/device/selectDeviceInverterInfo?deviceGuid={device_guid}"
-                    )
+    async def _fetch_inverter_details(self, inverter: Inverter):
+        """Fetch the details of the given inverter."""
+        device_guid = inverter.entity_id
+        inverter_info = await self._data_provider.get_data(
+            endpoint=f"tools/device/selectDeviceInverterInfo?deviceGuid={device_guid}",
+            fields=INVERTER_INFO_FIELDS,
+        )
 
-                    _LOGGER.debug(
-                        "Details for inverter GUID %s: %s",
-                        device_guid,
-                        json.dumps(inverter_info),
-                    )
-                    if inverter_info and "data" in inverter_info:
-                        inverter.data = inverter_info["data"]
+        _LOGGER.debug(
+            "Details for inverter GUID %s: %s",
+            device_guid,
+            LazyJson(inverter_info),
+        )
+        if inverter_info and "data" in inverter_info:
+            inverter.update(inverter_info["data"], self._data_provider.keep_raw_data)
+        else:
+            inverter.record_failure()
@@ -0,0 +1,205 @@
+"""Local data source fed by the MQTT topics of a TSUN proxy.
+
+The TSUN proxy (tsun-gen3-proxy) intercepts the traffic of the inverters to
+the cloud and publishes their values as JSON on ``<prefix>/<node>/<category>``.
+The local data providers translate these messages into the payload format of
+the cloud API, so the inverters are updated within seconds of reporting and
+without any cloud request. The transport is injected, so any MQTT client, or
+a stand-in broker for tests, can deliver the messages.
+"""
+
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+import logging
+from typing import Any
+
+from custom_components.tsun.pyTalentMonitor.inverter import (
+    Inverter,
+    InverterDataProvider,
+)
+from custom_components.tsun.pyTalentMonitor.power_station import (
+    PowerStationDataProvider,
+)
+from custom_components.tsun.pyTalentMonitor.projection import loads
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+DEFAULT_TOPIC_PREFIX = "tsun"
+
+# Categories and fields published by the proxy, mapped to the cloud fields
+GRID_CATEGORY = "grid"
+INPUT_CATEGORY = "input"
+TOTAL_CATEGORY = "total"
+ENV_CATEGORY = "env"
+INVERTER_CATEGORY = "inverter"
+STATE_CATEGORIES = frozenset(
+    (GRID_CATEGORY, INPUT_CATEGORY, TOTAL_CATEGORY, ENV_CATEGORY, INVERTER_CATEGORY)
+)
+GRID_FIELDS = {
+    "Voltage": "voltage",
+    "Current": "current",
+    "Frequency": "frequency",
+    "Output_Power": "activePower",
+}
+PV_FIELDS = {"Voltage": "voltage", "Current": "current", "Power": "power"}
+TOTAL_FIELDS = {"Daily_Generation": "dayEnergy"}
+ENV_FIELDS = {"Inverter_Temp": "inverterTemp", "Rated_Power": "ratedPower"}
+INVERTER_FIELDS = {
+    "Manufacturer": "nameOfManufacturer",
+    "Equipment_Model": "model",
+    "Serial_Number": "serialNumber",
+    "Version": "firmwareVersion1",
+}
+
+MessageCallback = Callable[[str, str | bytes], None]
+Subscribe = Callable[[str, MessageCallback], Awaitable[Callable[[], None]]]
+
+
+def _map_fields(state: dict, fields: dict[str, str]) -> dict[str, Any]:
+    """Return the fields of a proxy state renamed to the cloud fields."""
+    return {
+        cloud_field: state[proxy_field]
+        for proxy_field, cloud_field in fields.items()
+        if proxy_field in state
+    }
+
+
+def proxy_payload(node: str, states: dict[str, dict]) -> dict:
+    """Translate the latest proxy states of an inverter into a cloud payload.
+
+    The payload has no lastDataUpdateTime, the caller stamps it when the
+    values changed.
+    """
+    inputs = states.get(INPUT_CATEGORY, {})
+    pv = [
+        _map_fields(inputs[key], PV_FIELDS)
+        for key in sorted(inputs, key=lambda key: (len(key), key))
+        if key.startswith("pv") and isinstance(inputs[key], dict)
+    ]
+    payload = {
+        "deviceGuid": node,
+        **_map_fields(states.get(INVERTER_CATEGORY, {}), INVERTER_FIELDS),
+        **_map_fields(states.get(TOTAL_CATEGORY, {}), TOTAL_FIELDS),
+        **_map_fields(states.get(ENV_CATEGORY, {}), ENV_FIELDS),
+        # The cloud reports one more pv input than the inverter has
+        "pvCount": len(pv) + 1,
+        "pv": pv,
+    }
+    if GRID_CATEGORY in states:
+        payload["acPhaseCount"] = 1
+        payload["acPhaseExpress"] = "L1"
+        payload["phase"] = [_map_fields(states[GRID_CATEGORY], GRID_FIELDS)]
+    return payload
+
+
+class LocalInverterDataProvider(InverterDataProvider):
+    """Inverters updated by the MQTT messages of a TSUN proxy.
+
+    Inverters appear with their first message, named after their proxy
+    node. discover() and fetch_telemetry() have nothing to do.
+    """
+
+    def __init__(self, topic_prefix: str = DEFAULT_TOPIC_PREFIX) -> None:
+        """Initialize the data provider."""
+        super().__init__(None)
+        self._topic_prefix = topic_prefix.rstrip("/")
+        self._states: dict[str, dict[str, dict]] = {}
+        # Payload last applied per node, without its update time
+        self._payloads: dict[str, dict] = {}
+        self._listeners: list[Callable[[Inverter], None]] = []
+
+    @property
+    def topic_filter(self) -> str:
+        """Return the MQTT topic filter of the proxy state topics."""
+        return f"{self._topic_prefix}/+/+"
+
+    async def async_subscribe(self, subscribe: Subscribe) -> Callable[[], None]:
+        """Subscribe to the proxy topics, return the unsubscribe function."""
+        return await subscribe(self.topic_filter, self.handle_message)
+
+    def add_update_listener(
+        self, listener: Callable[[Inverter], None]
+    ) -> Callable[[], None]:
+        """Call listener with each inverter whose data changed.
+
+        Returns a function removing the listener again.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def handle_message(self, topic: str, payload: str | bytes) -> None:
+        """Apply a message of a proxy state topic.
+
+        Messages of other categories are ignored. The inverter is updated,
+        and its update time stamped, only if a value changed.
+        """
+        if not topic.startswith(f"{self._topic_prefix}/"):
+            return
+        parts = topic[len(self._topic_prefix) + 1 :].split("/")
+        if len(parts) != 2:
+            return
+        node, category = parts
+        if category not in STATE_CATEGORIES:
+            return
+        try:
+            state = loads(payload)
+        except ValueError:
+            _LOGGER.debug("Ignoring non JSON message on %s", topic)
+            return
+        if not isinstance(state, dict):
+            return
+
+        self._states.setdefault(node, {})[category] = state
+        payload = proxy_payload(node, self._states[node])
+        if payload == self._payloads.get(node):
+            return
+        self._payloads[node] = payload
+
+        inverter = self._inverters.get(node)
+        if inverter is None:
+            inverter = self._inverters[node] = Inverter(node, f"Inverter {node}")
+        revision = inverter.revision
+        inverter.update(
+            {
+                **payload,
+                "lastDataUpdateTime": datetime.now()
+                .astimezone()
+                .isoformat(timespec="seconds"),
+            }
+        )
+        if inverter.revision != revision:
+            for listener in list(self._listeners):
+                listener(inverter)
+
+    async def fetch_data(self) -> bool:
+        """Do nothing, the values are pushed by the proxy."""
+        return True
+
+    async def discover(self, page_listener=None) -> bool:
+        """Do nothing, the inverters appear with their first message."""
+        return True
+
+    async def fetch_telemetry(self):
+        """Do nothing, the values are pushed by the proxy."""
+
+
+class LocalPowerStationDataProvider(PowerStationDataProvider):
+    """Power stations of the local data source.
+
+    The proxy only knows inverters, so there are no power stations.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the data provider."""
+        super().__init__(None)
+
+    async def fetch_data(self) -> bool:
+        """Do nothing, there are no power stations."""
+        return True
+
+    async def discover(self, page_listener=None) -> bool:
+        """Do nothing, there are no power stations."""
+        return True
+
+    async def fetch_telemetry(self):
+        """Do nothing, there are no power stations."""
@@ -0,0 +1,176 @@
+"""Request metrics of the TalentMonitor API client."""
+
+import math
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+def endpoint_name(endpoint: str) -> str:
+    """Return the endpoint without query parameters."""
+    return endpoint.split("?", 1)[0]
+
+
+class EndpointMetrics:
+    """Counters and latency histogram of a single endpoint."""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "retries",
+        "bytes_received",
+        "latency_sum",
+        "latency_max",
+        "latency_buckets",
+        "status_codes",
+    )
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.status_codes: dict[int, int] = {}
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return the mean latency in seconds."""
+        if not self.requests:
+            return None
+        return self.latency_sum / self.requests
+
+    def record(self, latency: float, status: int | None, size: int) -> None:
+        """Record a completed request, status is None for a network error."""
+        self.requests += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[index] += 1
+                break
+        if status is not None:
+            self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        if status != 200:
+            self.errors += 1
+        self.bytes_received += size
+
+    def as_dict(self) -> dict:
+        """Return the metrics as a dictionary."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "latency_mean": self.latency_mean,
+            "latency_max": self.latency_max,
+            "latency_histogram": {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            },
+            "status_codes": dict(self.status_codes),
+        }
+
+
+class ApiMetrics:
+    """Metrics collected by the API client."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.unauthorized = 0
+        self.cycles = 0
+        self.last_cycle_duration: float | None = None
+        self.max_cycle_duration = 0.0
+        # Mean latency of the requests of the last completed cycle
+        self.last_cycle_latency_mean: float | None = None
+        self._cycle_latency_sum = 0.0
+        self._cycle_requests = 0
+
+    def endpoint(self, endpoint: str) -> EndpointMetrics:
+        """Return the metrics of an endpoint."""
+        name = endpoint_name(endpoint)
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointMetrics()
+        return self.endpoints[name]
+
+    def record_request(
+        self, endpoint: str, latency: float, status: int | None, size: int = 0
+    ) -> None:
+        """Record a completed request."""
+        self.endpoint(endpoint).record(latency, status, size)
+        self._cycle_latency_sum += latency
+        self._cycle_requests += 1
+        if status == 401:
+            self.unauthorized += 1
+
+    def record_retry(self, endpoint: str) -> None:
+        """Record that a request to an endpoint is repeated."""
+        self.endpoint(endpoint).retries += 1
+
+    def record_cycle(self, duration: float) -> None:
+        """Record the duration of a complete fetch cycle.
+
+        The requests recorded since the previous cycle make up the latency
+        of this cycle. A cycle without requests keeps the previous latency.
+        """
+        self.cycles += 1
+        self.last_cycle_duration = duration
+        self.max_cycle_duration = max(self.max_cycle_duration, duration)
+        if self._cycle_requests:
+            self.last_cycle_latency_mean = (
+                self._cycle_latency_sum / self._cycle_requests
+            )
+            self._cycle_latency_sum = 0.0
+            self._cycle_requests = 0
+
+    @property
+    def requests(self) -> int:
+        """Return the number of requests of all endpoints."""
+        return sum(metrics.requests for metrics in self.endpoints.values())
+
+    @property
+    def errors(self) -> int:
+        """Return the number of failed requests of all endpoints."""
+        return sum(metrics.errors for metrics in self.endpoints.values())
+
+    @property
+    def retries(self) -> int:
+        """Return the number of repeated requests of all endpoints."""
+        return sum(metrics.retries for metrics in self.endpoints.values())
+
+    @property
+    def bytes_received(self) -> int:
+        """Return the number of bytes received from all endpoints."""
+        return sum(metrics.bytes_received for metrics in self.endpoints.values())
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return the mean latency in seconds of all endpoints."""
+        requests = self.requests
+        if not requests:
+            return None
+        return (
+            sum(metrics.latency_sum for metrics in self.endpoints.values()) / requests
+        )
+
+    def as_dict(self) -> dict:
+        """Return the metrics as a dictionary."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "unauthorized": self.unauthorized,
+            "bytes_received": self.bytes_received,
+            "latency_mean": self.latency_mean,
+            "last_cycle_latency_mean": self.last_cycle_latency_mean,
+            "cycles": self.cycles,
+            "last_cycle_duration": self.last_cycle_duration,
+            "max_cycle_duration": self.max_cycle_duration,
+            "endpoints": {
+                name: metrics.as_dict() for name, metrics in self.endpoints.items()
+            },
+        }
@@ -1,19 +1,47 @@
 """TalentMonitor PowerStation."""
 
-import json
+from collections.abc import Callable
+from datetime import date, datetime, time, tzinfo
 import logging
 
-from custom_components.tsun.pyTalentMonitor.data_provider import DataProvider, Entity
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    RESPONSE_KEYS,
+    DataProvider,
+    DetailFetches,
+    Entity,
+    IncompleteListError,
+    LazyJson,
+    response_fields,
+)
 
 # Configure logging
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
-TIMEZONE = "+02:00"
+# Fields read from the power station list and details
+POWER_STATION_LIST_FIELDS = frozenset(
+    (*RESPONSE_KEYS, "powerStationGuid", "stationName")
+)
+POWER_STATION_INFO_FIELDS = response_fields()
+
+
+def utc_offset(day: date, time_zone: tzinfo | None = None) -> str:
+    """Return the UTC offset of a time zone on a day as the API expects, e.g. +02:00.
+
+    Without a time zone, the local time zone of the system is used.
+    """
+    moment = datetime.combine(day, time(12), time_zone)
+    if time_zone is None:
+        moment = moment.astimezone()
+    minutes = int(moment.utcoffset().total_seconds()) // 60
+    sign = "+" if minutes >= 0 else "-"
+    return f"{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
 
 
 class PowerStation(Entity):
     """Class for TalentMonitor power station."""
 
+    __slots__ = ()
+
     def __init__(self, entity_id: str, name: str) -> None:
         """Initialize the power station."""
         super().__init__(entity_id, name)
@@ -22,9 +50,16 @@ class PowerStation(Entity):
 class PowerStationDataProvider:
     """Data provider for power stations."""
 
-    def __init__(self, data_provider: DataProvider) -> None:
-        """Initialize the data provider."""
+    def __init__(
+        self, data_provider: DataProvider, time_zone: tzinfo | None = None
+    ) -> None:
+        """Initialize the data provider.
+
+        Dates and times are requested in time_zone, the local time zone of
+        the system if None.
+        """
         self._data_provider = data_provider
+        self._time_zone = time_zone
         self._power_stations = {}
 
     @property
@@ -36,36 +71,90 @@ class PowerStationDataProvider:
 
         return result
 
-    async def fetch_data(self):
-        """Fetch the data of the power stations."""
-        data = await self._data_provider.get_data(endpoint="system/station/list")
-        if data and "rows" in data:
-            for power_station_data in data["rows"]:
-                if "powerStationGuid" in power_station_data:
-                    power_station_guid = power_station_data["powerStationGuid"]
-                    power_station_name = power_station_data["stationName"]
-
-                    _LOGGER.debug(
-                        "Data for powerstation GUID %s: %s",
-                        power_station_guid,
-                        json.dumps(power_station_data),
-                    )
-
-                    if power_station_guid not in self._power_stations:
-                        self._power_stations[power_station_guid] = PowerStation(
-                            power_station_guid, power_station_name
+    def restore(self, snapshots: list[dict]):
+        """Restore power stations from topology snapshots until they are discovered."""
+        for snapshot in snapshots:
+            power_station_guid = snapshot["entity_id"]
+            if power_station_guid not in self._power_stations:
+                power_station = PowerStation(power_station_guid, snapshot["name"])
+                power_station.restore(snapshot)
+                self._power_stations[power_station_guid] = power_station
+
+    async def fetch_data(self) -> bool:
+        """Discover the power stations and fetch their details page by page.
+
+        Returns true if the list of power stations was read completely.
+        """
+        fetches = DetailFetches(self._fetch_power_station_details)
+        try:
+            discovered = await self.discover(fetches.start)
+        except BaseException:
+            await fetches.cancel()
+            raise
+        # Power stations known from an earlier discovery or the topology
+        fetches.start(self.power_stations)
+        await fetches.gather()
+        return discovered
+
+    async def discover(
+        self, page_listener: Callable[[list[PowerStation]], None] | None = None
+    ) -> bool:
+        """Fetch the list of power stations, adding them as each page arrives.
+
+        page_listener is called with the power stations of each page.
+        Returns true if the list was read completely.
+        """
+        try:
+            async for rows in self._data_provider.iter_pages(
+                "system/station/list", POWER_STATION_LIST_FIELDS, "powerStationGuid"
+            ):
+                page = []
+                for power_station_data in rows:
+                    if "powerStationGuid" in power_station_data:
+                        power_station_guid = power_station_data["powerStationGuid"]
+                        power_station_name = power_station_data["stationName"]
+
+                        _LOGGER.debug(
+                            "Data for powerstation GUID %s: %s",
+                            power_station_guid,
+                            LazyJson(power_station_data),
                         )
 
-                    power_station = self._power_stations[power_station_guid]
-
-                    power_station_info = await self._data_provider.get_data(
-                        endpoint=f"system/station/getPowerStationByGuid?powerStationGuid={power_station_guid}&timezone={TIMEZONE}"
-                    )
-
-                    _LOGGER.debug(
-                        "Details for powerstation GUID %s: %s",
-                        power_station_guid,
-                        json.dumps(power_station_info),
-                    )
-                    if power_station_info and "data" in power_station_info:
-                        power_station.data = power_station_info["data"]
+                        if power_station_guid not in self._power_stations:
+                            self._power_stations[power_station_guid] = PowerStation(
+                                power_station_guid, power_station_name
+                            )
+                        page.append(self._power_stations[power_station_guid])
+                if page_listener is not None:
+                    page_listener(page)
+        except IncompleteListError as err:
+            _LOGGER.warning("Discovering the power stations failed: %s", err)
+            return False
+        return True
+
+    async def fetch_telemetry(self):
+        """Fetch the details of the known power stations."""
+        fetches = DetailFetches(self._fetch_power_station_details)
+        fetches.start(self.power_stations)
+        await fetches.gather()
+
+    async def _fetch_power_station_details(self, power_station: PowerStation):
+        """Fetch the details of the given power station."""
+        power_station_guid = power_station.entity_id
+        timezone = utc_offset(datetime.now(self._time_zone).date(), self._time_zone)
+        power_station_info = await self._data_provider.get_data(
+            endpoint=f"system/station/getPowerStationByGuid?powerStationGuid={power_station_guid}&timezone={timezone}",
+            fields=POWER_STATION_INFO_FIELDS,
+        )
+
+        _LOGGER.debug(
+            "Details for powerstation GUID %s: %s",
+            power_station_guid,
+            LazyJson(power_station_info),
+        )
+        if power_station_info and "data" in power_station_info:
+            power_station.update(
+                power_station_info["data"], self._data_provider.keep_raw_data
+            )
+        else:
+            power_station.record_failure()
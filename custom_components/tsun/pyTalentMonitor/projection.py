@@ -0,0 +1,50 @@
+"""Decode API responses, keeping only the fields that are read.
+
+The detail responses carry far more fields than the sensors use. orjson is
+used when available, e.g. within Home Assistant, and decodes the complete
+document faster than any projection afterwards could save. The standard
+library fallback reduces every JSON object to the projected keys, at any
+depth, while decoding, so the dropped values are never built.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def project(data: Any, fields: frozenset[str]) -> Any:
+    """Return data with every object reduced to the given fields."""
+    if isinstance(data, dict):
+        return {
+            key: project(value, fields)
+            for key, value in data.items()
+            if key in fields
+        }
+    if isinstance(data, list):
+        return [project(value, fields) for value in data]
+    return data
+
+
+def loads(body: str | bytes, fields: frozenset[str] | None = None) -> Any:
+    """Decode a JSON document, projected to fields if given.
+
+    With orjson the document is returned complete, the fields are only a
+    hint for the slower standard library decoder. Raises ValueError if the
+    document is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+
+    if fields is None:
+        return json.loads(body)
+    # Drop the unused fields while the objects are decoded
+    return json.loads(
+        body,
+        object_pairs_hook=lambda pairs: {
+            key: value for key, value in pairs if key in fields
+        },
+    )
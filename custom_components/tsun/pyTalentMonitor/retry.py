@@ -0,0 +1,140 @@
+"""Retry policy and circuit breaker of the TalentMonitor API client."""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import time
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# Status codes worth repeating a request for
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_MAX_RETRIES = 3
+# Backoff in seconds before the first retry, doubled for each further retry
+DEFAULT_BACKOFF_BASE = 0.5
+# Longer delays are not waited for within a poll cycle
+DEFAULT_BACKOFF_MAX = 30.0
+
+# Consecutive failed requests that open the circuit
+DEFAULT_FAILURE_THRESHOLD = 5
+# Seconds the circuit stays open before a trial request is let through
+DEFAULT_RESET_TIMEOUT = 60.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending requests while the API is considered down."""
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = DEFAULT_BACKOFF_BASE,
+    maximum: float = DEFAULT_BACKOFF_MAX,
+) -> float:
+    """Return the delay before the given retry (0 based), with full jitter."""
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds requested by a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Stop sending requests after repeated failures.
+
+    After failure_threshold consecutive failures the circuit opens and
+    requests fail fast for reset_timeout seconds. Then a single trial
+    request is let through; its success closes the circuit again, its
+    failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_pending = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        """Return the state of the circuit."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_request(self) -> bool:
+        """Raise CircuitOpenError unless a request may be sent.
+
+        Returns true if the request is the trial request of a half open
+        circuit. Its outcome must be recorded, or the trial released.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return False
+        if state == self.HALF_OPEN and not self._trial_pending:
+            self._trial_pending = True
+            return True
+        raise CircuitOpenError("TalentMonitor API is unavailable")
+
+    def release_trial(self) -> None:
+        """Let the next request be the trial if the trial ended without outcome."""
+        self._trial_pending = False
+
+    def record_success(self) -> None:
+        """Record a successful request and close the circuit."""
+        if self._opened_at is not None:
+            _LOGGER.info("TalentMonitor API is available again")
+        self._failures = 0
+        self._opened_at = None
+        self._trial_pending = False
+
+    def record_failure(self) -> None:
+        """Record a failed request and open the circuit if necessary."""
+        self._failures += 1
+        if self._trial_pending or (
+            self._opened_at is None and self._failures >= self._failure_threshold
+        ):
+            if self._opened_at is None:
+                _LOGGER.warning(
+                    "TalentMonitor API failed %d times in a row, pausing requests"
+                    " for %d seconds",
+                    self._failures,
+                    self._reset_timeout,
+                )
+            self.trips += 1
+            self._opened_at = time.monotonic()
+            self._trial_pending = False
+
+    def as_dict(self) -> dict:
+        """Return the state of the circuit breaker as a dictionary."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self.trips,
+        }
@@ -0,0 +1,54 @@
+"""HTTP session tuned for the TalentMonitor cloud API."""
+
+import ssl
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+)
+
+# Seconds an idle connection is kept open, longer than the default poll interval
+KEEPALIVE_TIMEOUT = 75
+# Seconds resolved addresses of the API host are cached
+DNS_CACHE_TTL = 600
+DEFAULT_TIMEOUT = ClientTimeout(total=60, connect=15)
+
+
+def create_connector(
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+    max_concurrent_requests_per_host: int = DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    ssl_context: ssl.SSLContext | bool = True,
+) -> TCPConnector:
+    """Create a connector pooling keep-alive connections to the API host.
+
+    The connection limits match the request limits of the DataProvider, so
+    every request slot has a warm connection and no handshake is repeated
+    within a poll cycle. Pass one SSL context shared by all connectors to
+    avoid building a new one per session.
+    """
+    return TCPConnector(
+        limit=max(1, max_concurrent_requests),
+        limit_per_host=max(1, max_concurrent_requests_per_host),
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        ssl=ssl_context,
+    )
+
+
+def create_session(
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+    max_concurrent_requests_per_host: int = DEFAULT_MAX_CONCURRENT_REQUESTS_PER_HOST,
+    ssl_context: ssl.SSLContext | bool = True,
+    headers: dict[str, str] | None = None,
+) -> ClientSession:
+    """Create a session for the API using a pooled, tuned connector."""
+    return ClientSession(
+        connector=create_connector(
+            max_concurrent_requests, max_concurrent_requests_per_host, ssl_context
+        ),
+        headers=headers,
+        timeout=DEFAULT_TIMEOUT,
+    )
@@ -0,0 +1,102 @@
+"""Adaptive polling scheduler for the TalentMonitor integration."""
+
+from collections import deque
+from datetime import datetime
+from datetime import timedelta
+import logging
+from statistics import median
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+MIN_INTERVAL = timedelta(seconds=10)
+NIGHT_INTERVAL = timedelta(minutes=30)
+# Poll this long after the expected upstream update to make sure it is visible
+ALIGNMENT_MARGIN = timedelta(seconds=5)
+# Plausible range of the upstream refresh cadence
+MIN_CADENCE = timedelta(seconds=30)
+MAX_CADENCE = timedelta(hours=1)
+HISTORY_SIZE = 10
+
+
+class AdaptivePollingScheduler:
+    """Compute the next poll interval from the observed upstream refresh cadence.
+
+    The cadence is the median distance between successive lastDataUpdateTime
+    values. The smallest observed delay between an upstream update and the
+    poll that saw it is used to align the next poll just after the expected
+    next upstream update. While the expected update is overdue, e.g. for an
+    offline inverter or a stalled portal, the checks back off exponentially
+    to the base interval. Between sunset and sunrise the interval backs off.
+    """
+
+    def __init__(self, base_interval: timedelta) -> None:
+        """Initialize the scheduler."""
+        self._base_interval = base_interval
+        self._cadences: deque[float] = deque(maxlen=HISTORY_SIZE)
+        self._offsets: deque[float] = deque(maxlen=HISTORY_SIZE)
+        self._last_upstream_update: float | None = None
+        # Polls since the expected upstream update became overdue
+        self._overdue_polls = 0
+
+    @property
+    def cadence(self) -> timedelta | None:
+        """Return the learned upstream refresh cadence."""
+        if not self._cadences:
+            return None
+        return timedelta(seconds=median(self._cadences))
+
+    def observe(self, upstream_update: datetime | None, now: datetime) -> None:
+        """Record the latest lastDataUpdateTime seen at the given time."""
+        if upstream_update is None:
+            return
+
+        upstream = upstream_update.timestamp()
+        if upstream == self._last_upstream_update:
+            return
+
+        if self._last_upstream_update is not None:
+            cadence = upstream - self._last_upstream_update
+            if (
+                MIN_CADENCE.total_seconds()
+                <= cadence
+                <= MAX_CADENCE.total_seconds()
+            ):
+                self._cadences.append(cadence)
+
+        # The offset also absorbs a timezone difference of the upstream clock
+        self._offsets.append(now.timestamp() - upstream)
+        self._last_upstream_update = upstream
+        self._overdue_polls = 0
+
+    def next_interval(
+        self, now: datetime, sun_is_up: bool, next_sunrise: datetime | None
+    ) -> timedelta:
+        """Return the interval until the next poll."""
+        if not sun_is_up:
+            interval = NIGHT_INTERVAL
+            if next_sunrise is not None:
+                interval = min(interval, next_sunrise - now)
+            return max(interval, MIN_INTERVAL)
+
+        cadence = self.cadence
+        if cadence is None or self._last_upstream_update is None:
+            return self._base_interval
+
+        expected = (
+            self._last_upstream_update
+            + cadence.total_seconds()
+            + min(self._offsets)
+            + ALIGNMENT_MARGIN.total_seconds()
+        )
+        remaining = timedelta(seconds=expected - now.timestamp())
+        if remaining <= timedelta(0):
+            # The upstream update is overdue, check again with growing delays
+            interval = MIN_INTERVAL * 2**self._overdue_polls
+            if interval < self._base_interval:
+                self._overdue_polls += 1
+            return min(interval, self._base_interval)
+
+        _LOGGER.debug(
+            "Next upstream update expected in %s (cadence %s)", remaining, cadence
+        )
+        return max(remaining, MIN_INTERVAL)
@@ -1,32 +1,53 @@
 """Sensor platform for TalentMonitor."""
 
+from collections.abc import Callable
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime
+from datetime import timedelta
 import logging
 import re
+import time
+from typing import Any
 from custom_components.tsun.entity import (
     TalentMonitorEntity,
+    TalentMonitorHubEntity,
     TalentMonitorInverterEntity,
 )
 from custom_components.tsun.pyTalentMonitor.data_provider import Entity
+from custom_components.tsun.pyTalentMonitor.data_provider import SensorValue
 from custom_components.tsun.pyTalentMonitor.inverter import Inverter
+from custom_components.tsun.pyTalentMonitor.metrics import ApiMetrics
 from custom_components.tsun.pyTalentMonitor.power_station import PowerStation
 from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.components.sensor import RestoreSensor
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorExtraStoredData
 from homeassistant.components.sensor import SensorEntityDescription
 from homeassistant.components.sensor import SensorStateClass
+from homeassistant.const import EntityCategory
 from homeassistant.const import UnitOfElectricCurrent
 from homeassistant.const import UnitOfElectricPotential
 from homeassistant.const import UnitOfEnergy
 from homeassistant.const import UnitOfFrequency
+from homeassistant.const import UnitOfInformation
 from homeassistant.const import UnitOfTemperature
 from homeassistant.const import UnitOfPower
+from homeassistant.const import UnitOfTime
+from homeassistant.core import CALLBACK_TYPE
 from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import StateType
 
+from .const import CONF_SIGNIFICANCE_FILTER
 from .const import DOMAIN
 
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
+# Polling interval of the hub sensors, the device sensors use the coordinator
+SCAN_INTERVAL = timedelta(seconds=60)
+
 camel_case_to_snake_case = re.compile(r"(?<!^)(?=[A-Z])")
 
 SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
@@ -97,6 +118,103 @@ SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
 
 SENSORS = {desc.key: desc for desc in SENSOR_TYPES}
 
+
+@dataclass(frozen=True, kw_only=True)
+class SensorWriteFilter:
+    """Significance filter for the state writes of a sensor class.
+
+    A change is significant if it exceeds the absolute deadband or the
+    relative deadband, a fraction of the last written value. Significant
+    changes are written at most every min_interval seconds, insignificant
+    ones only as heartbeat once max_interval seconds passed.
+    """
+
+    absolute: float = 0.0
+    relative: float = 0.0
+    min_interval: float = 0.0
+    max_interval: float = 900.0
+
+    def is_significant(self, written_value: Any, value: Any) -> bool:
+        """Return true if value differs significantly from the written value."""
+        try:
+            written = float(written_value)
+            current = float(value)
+        except (TypeError, ValueError):
+            return written_value != value
+        return abs(current - written) > max(self.absolute, abs(written) * self.relative)
+
+
+# Filters of the measurement sensors by device class. The power unit is
+# reported by the API (W or kW), so power only has a relative deadband.
+WRITE_FILTERS: dict[SensorDeviceClass, SensorWriteFilter] = {
+    SensorDeviceClass.POWER: SensorWriteFilter(relative=0.02, min_interval=30),
+    SensorDeviceClass.VOLTAGE: SensorWriteFilter(absolute=1.0, min_interval=30),
+    SensorDeviceClass.CURRENT: SensorWriteFilter(
+        absolute=0.05, relative=0.02, min_interval=30
+    ),
+    SensorDeviceClass.FREQUENCY: SensorWriteFilter(absolute=0.05, min_interval=30),
+    SensorDeviceClass.TEMPERATURE: SensorWriteFilter(absolute=0.5, min_interval=60),
+}
+
+
+@dataclass(frozen=True, kw_only=True)
+class TalentMonitorMetricSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor of the API client metrics."""
+
+    value_fn: Callable[[ApiMetrics], StateType]
+
+
+METRIC_SENSOR_TYPES: tuple[TalentMonitorMetricSensorEntityDescription, ...] = (
+    TalentMonitorMetricSensorEntityDescription(
+        key="cycle_duration",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=2,
+        value_fn=lambda metrics: metrics.last_cycle_duration,
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="request_latency",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        # The mean of the last cycle, the lifetime mean hardly moves after a while
+        value_fn=lambda metrics: (
+            metrics.last_cycle_latency_mean * 1000
+            if metrics.last_cycle_latency_mean is not None
+            else None
+        ),
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.requests,
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="request_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.errors,
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="request_retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.retries,
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="unauthorized_responses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.unauthorized,
+    ),
+    TalentMonitorMetricSensorEntityDescription(
+        key="bytes_received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        value_fn=lambda metrics: metrics.bytes_received,
+    ),
+)
+
 SENSOR_UNIT_MAPPING = {
     "Wh": UnitOfEnergy.WATT_HOUR,
     "kWh": UnitOfEnergy.KILO_WATT_HOUR,
@@ -108,80 +226,91 @@ SENSOR_UNIT_MAPPING = {
 async def async_setup_entry(hass, entry, async_add_devices):
     """Set up sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    # Keys of the sensors already added and revisions of the scanned devices
+    known_sensors: set[tuple] = set()
+    scanned_revisions: dict[str, int] = {}
+
+    @callback
+    def _async_add_new_sensors() -> None:
+        """Add the sensors of devices and values that appeared since the last scan."""
+        sensors = list(
+            _new_device_sensors(coordinator, known_sensors, scanned_revisions)
+        )
+        if sensors:
+            _LOGGER.debug("Adding %d sensors", len(sensors))
+            async_add_devices(sensors)
+
+    async_add_devices(
+        [
+            *(
+                TalentMonitorMetricSensor(coordinator, entry, description)
+                for description in METRIC_SENSOR_TYPES
+            ),
+            *_new_device_sensors(coordinator, known_sensors, scanned_revisions),
+        ]
+    )
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_sensors))
+
+
+def _new_device_sensors(
+    coordinator, known_sensors: set[tuple], scanned_revisions: dict[str, int]
+) -> Iterator[SensorEntity]:
+    """Yield the sensors of all devices that are not in known_sensors yet.
+
+    Devices whose data did not change since the last scan are skipped.
+    """
     power_stations: list[PowerStation] = coordinator.api.get_power_stations()
     for power_station in power_stations:
-        for _, value in enumerate(power_station.data):
-            _LOGGER.debug("Iterate data for powerstation %s", value)
-            if value and value in SENSORS:
-                async_add_devices(
-                    [
-                        TalentMonitorPowerStationSensor(
-                            coordinator,
-                            power_station,
-                            SENSORS[value],
-                        )
-                    ]
+        if scanned_revisions.get(power_station.entity_id) == power_station.revision:
+            continue
+        scanned_revisions[power_station.entity_id] = power_station.revision
+
+        for value in power_station.values:
+            sensor_key = (power_station.entity_id, value)
+            if value in SENSORS and sensor_key not in known_sensors:
+                known_sensors.add(sensor_key)
+                yield TalentMonitorPowerStationSensor(
+                    coordinator, power_station, SENSORS[value]
                 )
 
     inverters: list[Inverter] = coordinator.api.get_inverters()
     for inverter in inverters:
-        for _, value in enumerate(inverter.data):
-            _LOGGER.debug("Iterate data for inverter %s", value)
-            if value and value in SENSORS:
-                async_add_devices(
-                    [
-                        TalentMonitorInverterSensor(
-                            coordinator,
-                            inverter,
-                            SENSORS[value],
-                        )
-                    ]
-                )
-            if value == "pv" and "pvCount" in inverter.data:
-                for index, pv in enumerate(inverter.data[value]):
-                    if index < inverter.data["pvCount"] - 1 and index < len(
-                        inverter.data[value]
-                    ):  # it seems pvCount is not set correctly as it is set to 3 when there are only 2 panels, subtracting 1 is a solution for now but might result in a problem at some point
-                        for _, pv_value in enumerate(pv):
-                            _LOGGER.debug(
-                                "Iterate pv %d for inverter %s", index, pv_value
-                            )
-                            if pv_value and pv_value in SENSORS:
-                                async_add_devices(
-                                    [
-                                        TalentMonitorInverterPanelSensor(
-                                            coordinator,
-                                            inverter,
-                                            SENSORS[pv_value],
-                                            index,
-                                        )
-                                    ]
-                                )
-
-            if value == "phase" and "acPhaseCount" in inverter.data:
-                for index, phase in enumerate(inverter.data[value]):
-                    if index < inverter.data["acPhaseCount"] and index < len(
-                        inverter.data[value]
-                    ):
-                        for _, phase_value in enumerate(phase):
-                            _LOGGER.debug(
-                                "Iterate phase %d for inverter %s", index, phase_value
-                            )
-                            if phase_value and phase_value in SENSORS:
-                                async_add_devices(
-                                    [
-                                        TalentMonitorInverterPhaseSensor(
-                                            coordinator,
-                                            inverter,
-                                            SENSORS[phase_value],
-                                            index,
-                                        )
-                                    ]
-                                )
-
-
-class TalentMonitorSensor(SensorEntity):
-    """TalentMonitor Sensor class."""
+        if scanned_revisions.get(inverter.entity_id) == inverter.revision:
+            continue
+        scanned_revisions[inverter.entity_id] = inverter.revision
+
+        for value in inverter.values:
+            sensor_key = (inverter.entity_id, value)
+            if value in SENSORS and sensor_key not in known_sensors:
+                known_sensors.add(sensor_key)
+                yield TalentMonitorInverterSensor(coordinator, inverter, SENSORS[value])
+
+        for pv in inverter.pv:
+            for pv_value in pv.values:
+                sensor_key = (inverter.entity_id, "panel", pv.index, pv_value)
+                if pv_value in SENSORS and sensor_key not in known_sensors:
+                    known_sensors.add(sensor_key)
+                    yield TalentMonitorInverterPanelSensor(
+                        coordinator, inverter, SENSORS[pv_value], pv.index
+                    )
+
+        for phase in inverter.phases:
+            for phase_value in phase.values:
+                sensor_key = (inverter.entity_id, "phase", phase.index, phase_value)
+                if phase_value in SENSORS and sensor_key not in known_sensors:
+                    known_sensors.add(sensor_key)
+                    yield TalentMonitorInverterPhaseSensor(
+                        coordinator, inverter, SENSORS[phase_value], phase.index
+                    )
+
+
+class TalentMonitorSensor(RestoreSensor):
+    """TalentMonitor Sensor class.
+
+    Until the device is fetched for the first time, e.g. after a start from
+    the persisted topology, the sensor shows its restored last state.
+    Measurement sensors with a write filter skip insignificant changes.
+    """
 
     def __init__(
         self,
@@ -189,51 +318,134 @@ class TalentMonitorSensor(SensorEntity):
     ):
         """Initialize a TalentMonitor sensor."""
         self._entity = entity
+        self._resolved_revision: int | None = None
+        self._resolved_value = None
+        self._resolved_unit: str | None = None
+        self._restored_data: SensorExtraStoredData | None = None
+        self._write_filter: SensorWriteFilter | None = None
+        # Value, availability, staleness and unit written last and when
+        self._written: tuple[Any, tuple, float] | None = None
+        self._cancel_deferred_write: CALLBACK_TYPE | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state if the device has not been fetched yet."""
+        await super().async_added_to_hass()
+        if self._entity.last_success is None:
+            self._restored_data = await self.async_get_last_sensor_data()
+        if (
+            self.coordinator.config_entry.options.get(CONF_SIGNIFICANCE_FILTER, False)
+            and self.entity_description.state_class == SensorStateClass.MEASUREMENT
+        ):
+            self._write_filter = WRITE_FILTERS.get(self.entity_description.device_class)
+        self.async_on_remove(self._async_cancel_deferred_write)
+
+    @callback
+    def _async_write_device_state(self) -> None:
+        """Write the state unless the change is insignificant or too frequent.
+
+        Called by _handle_coordinator_update of TalentMonitorEntity. Changes of
+        the availability, staleness or unit are always written.
+        """
+        write_filter = self._write_filter
+        if write_filter is None or self._written is None:
+            self._async_write_state()
+            return
+
+        written_value, written_flags, written_at = self._written
+        elapsed = time.monotonic() - written_at
+        if self._state_flags != written_flags or elapsed >= write_filter.max_interval:
+            self._async_write_state()
+        elif not write_filter.is_significant(written_value, self.native_value):
+            return
+        elif elapsed < write_filter.min_interval:
+            if self._cancel_deferred_write is None:
+                self._cancel_deferred_write = async_call_later(
+                    self.hass,
+                    write_filter.min_interval - elapsed,
+                    self._async_deferred_write,
+                )
+        else:
+            self._async_write_state()
+
+    @property
+    def _state_flags(self) -> tuple:
+        """Return the availability, staleness and unit of the state."""
+        return (
+            self.available,
+            (self.extra_state_attributes or {}).get("stale"),
+            self.native_unit_of_measurement,
+        )
 
     @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
+    def _async_write_state(self) -> None:
+        """Write the state and remember what was written."""
+        self._async_cancel_deferred_write()
+        self._written = (self.native_value, self._state_flags, time.monotonic())
         self.async_write_ha_state()
 
+    @callback
+    def _async_deferred_write(self, _now: datetime) -> None:
+        """Write a significant change held back by the minimum interval."""
+        self._cancel_deferred_write = None
+        self._async_write_device_state()
+
+    @callback
+    def _async_cancel_deferred_write(self) -> None:
+        """Cancel a pending deferred write."""
+        if self._cancel_deferred_write is not None:
+            self._cancel_deferred_write()
+            self._cancel_deferred_write = None
+
+    @property
+    def _use_restored_data(self) -> bool:
+        """Return true if the restored state is shown instead of live data."""
+        if self._restored_data is None:
+            return False
+        if self._entity.last_success is not None:
+            self._restored_data = None
+            return False
+        return True
+
     @property
-    def data(self):
-        """Return the data of this sensor."""
-        return self._entity.data
+    def values(self) -> dict[str, SensorValue]:
+        """Return the parsed values of this sensor."""
+        return self._entity.values
+
+    def _resolve(self) -> None:
+        """Resolve value and unit once per data revision of the entity."""
+        if self._resolved_revision == self._entity.revision:
+            return
+        self._resolved_revision = self._entity.revision
+
+        key = self.entity_description.key
+        sensor_value = self.values.get(key)
+        self._resolved_unit = self.entity_description.native_unit_of_measurement
+        if sensor_value is None or sensor_value.value is None:
+            self._resolved_value = None
+        elif key == "lastDataUpdateTime":
+            self._resolved_value = datetime.fromisoformat(sensor_value.value)
+        else:
+            self._resolved_value = sensor_value.value
+            if sensor_value.unit is not None:
+                self._resolved_unit = SENSOR_UNIT_MAPPING.get(
+                    sensor_value.unit, self._resolved_unit
+                )
 
     @property
     def native_value(self):
         """Return the state of the sensor."""
-
-        if self.entity_description.key == "lastDataUpdateTime":
-            return datetime.fromisoformat(self.data[self.entity_description.key])
-        else:
-            key_for_value_with_unit = self.entity_description.key + "Named"
-
-            if (
-                key_for_value_with_unit in self.data
-                and self.data[key_for_value_with_unit]
-            ):
-                value_split = self.data[key_for_value_with_unit].split(" ")
-
-                if value_split and len(value_split) == 2:
-                    value = value_split[0]
-                    return value
-                else:
-                    return self.data[self.entity_description.key]
-            else:
-                return self.data[self.entity_description.key]
+        if self._use_restored_data:
+            return self._restored_data.native_value
+        self._resolve()
+        return self._resolved_value
 
     @property
     def native_unit_of_measurement(self) -> str | None:
         """Return the unit of measurement."""
-        key_for_value_with_unit = self.entity_description.key + "Named"
-
-        if key_for_value_with_unit in self.data and self.data[key_for_value_with_unit]:
-            value_split = self.data[key_for_value_with_unit].split(" ")
-            if value_split and len(value_split) == 2:
-                unit = value_split[1]
-                return SENSOR_UNIT_MAPPING[unit]
-        return self.entity_description.native_unit_of_measurement
+        if self._use_restored_data:
+            return self._restored_data.native_unit_of_measurement
+        self._resolve()
+        return self._resolved_unit
 
 
 class TalentMonitorPowerStationSensor(TalentMonitorEntity, TalentMonitorSensor):
@@ -300,12 +512,9 @@ class TalentMonitorInverterPhaseSensor(
             "phase" + str(phase_index) + sensorEntityDescription.key,
         )
         TalentMonitorSensor.__init__(self, inverter)
-        phase_name = (
-            inverter.data["acPhaseExpress"].split(",")[phase_index]
-            if "acPhaseExpress" in inverter.data
-            else phase_index
-        )
-        self._attr_translation_placeholders = {"phase_id": phase_name}
+        self._attr_translation_placeholders = {
+            "phase_id": inverter.phases[phase_index].name
+        }
         self.entity_description = sensorEntityDescription
         self.translation_key = (
             "talentmonitor_inverter_phase_"
@@ -314,9 +523,12 @@ class TalentMonitorInverterPhaseSensor(
         self._phase_index = phase_index
 
     @property
-    def data(self):
-        """Return the data of this sensor."""
-        return self._entity.data["phase"][self._phase_index]
+    def values(self) -> dict[str, SensorValue]:
+        """Return the parsed values of this sensor."""
+        phases = self._entity.phases
+        if self._phase_index < len(phases):
+            return phases[self._phase_index].values
+        return {}
 
 
 class TalentMonitorInverterPanelSensor(
@@ -348,6 +560,35 @@ class TalentMonitorInverterPanelSensor(
         self._panel_index = panel_index
 
     @property
-    def data(self):
-        """Return the data of this sensor."""
-        return self._entity.data["pv"][self._panel_index]
+    def values(self) -> dict[str, SensorValue]:
+        """Return the parsed values of this sensor."""
+        pv = self._entity.pv
+        if self._panel_index < len(pv):
+            return pv[self._panel_index].values
+        return {}
+
+
+class TalentMonitorMetricSensor(TalentMonitorHubEntity, SensorEntity):
+    """TalentMonitor API client metric sensor class."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: TalentMonitorMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator,
+        entry,
+        sensorEntityDescription: TalentMonitorMetricSensorEntityDescription,
+    ):
+        """Initialize a TalentMonitor metric sensor."""
+        TalentMonitorHubEntity.__init__(
+            self, coordinator, entry, sensorEntityDescription.key
+        )
+
+        self.entity_description = sensorEntityDescription
+        self.translation_key = "talentmonitor_hub_" + sensorEntityDescription.key
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state of the sensor."""
+        return self.entity_description.value_fn(self.coordinator.api.metrics)
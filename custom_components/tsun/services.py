@@ -0,0 +1,77 @@
+"""Services of the TalentMonitor integration."""
+
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.core import SupportsResponse
+from homeassistant.core import callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+import voluptuous as vol
+
+from .const import DATA_HISTORY
+from .const import DOMAIN
+from .const import SERVICE_GET_HISTORY
+from .history import RESOLUTIONS
+
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_RESOLUTION = "resolution"
+ATTR_CHANNELS = "channels"
+
+GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_RESOLUTION, default="5min"): vol.In(RESOLUTIONS),
+        vol.Optional(ATTR_CHANNELS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def _async_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return the recorded history of a device."""
+        store = hass.data.get(DOMAIN, {}).get(DATA_HISTORY)
+        if store is None:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN, translation_key="history_disabled"
+            )
+
+        device = dr.async_get(hass).async_get(call.data[ATTR_DEVICE_ID])
+        device_guid = next(
+            (
+                identifier
+                for domain, identifier in (device.identifiers if device else ())
+                if domain == DOMAIN
+            ),
+            None,
+        )
+        if device_guid is None:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN, translation_key="unknown_device"
+            )
+
+        return await hass.async_add_executor_job(
+            store.query,
+            device_guid,
+            dt_util.as_utc(call.data[ATTR_START]),
+            dt_util.as_utc(call.data.get(ATTR_END, dt_util.utcnow())),
+            call.data[ATTR_RESOLUTION],
+            call.data.get(ATTR_CHANNELS),
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        _async_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
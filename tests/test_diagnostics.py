@@ -0,0 +1,36 @@
+"""Tests for the diagnostics."""
+
+from custom_components.tsun.diagnostics import _entity_diagnostics, _redact_payload
+from custom_components.tsun.pyTalentMonitor.power_station import PowerStation
+from homeassistant.components.diagnostics import REDACTED
+
+
+def test_recorded_payloads_hide_the_guids() -> None:
+    """Test the GUIDs are redacted from endpoints and payloads."""
+    payload = _redact_payload(
+        {
+            "time": 0,
+            "endpoint": "system/station/getPowerStationByGuid"
+            "?powerStationGuid=station-1&timezone=+02:00",
+            "payload": {
+                "rows": [{"deviceGuid": "device-1", "powerStationGuid": "station-1"}]
+            },
+        }
+    )
+
+    assert payload["endpoint"] == (
+        "system/station/getPowerStationByGuid"
+        f"?powerStationGuid={REDACTED}&timezone=+02:00"
+    )
+    assert payload["payload"]["rows"] == [
+        {"deviceGuid": REDACTED, "powerStationGuid": REDACTED}
+    ]
+    assert "station-1" not in str(payload)
+
+
+def test_entity_diagnostics_hide_the_guid() -> None:
+    """Test the GUID of a device is not part of its diagnostics."""
+    diagnostics = _entity_diagnostics(PowerStation("station-1", "Home"))
+
+    assert diagnostics["entity_id"] == REDACTED
+    assert diagnostics["name"] == "Home"
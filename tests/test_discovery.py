@@ -0,0 +1,53 @@
+"""Tests for the discovery cycle of the TalentSolarMonitor client."""
+
+import pytest
+
+from custom_components.tsun.pyTalentMonitor import TalentSolarMonitor
+from custom_components.tsun.pyTalentMonitor.data_provider import DataProvider
+
+
+class ListDataProvider(DataProvider):
+    """DataProvider serving one inverter and one power station."""
+
+    def __init__(self) -> None:
+        """Initialize the fake API."""
+        super().__init__("user", "password", None)
+        self.fail_lists = False
+        self.list_requests = 0
+
+    async def get_data(self, endpoint, fields=None):
+        """Return the lists, or None while they fail, and the details."""
+        if "pageNum" in endpoint:
+            self.list_requests += 1
+            if self.fail_lists:
+                return None
+            if endpoint.startswith("system/station/list"):
+                rows = [{"powerStationGuid": "station", "stationName": "Station"}]
+            else:
+                rows = [{"deviceGuid": "inverter"}]
+            return {"total": 1, "rows": rows}
+        return {"data": {"totalActivePower": 1}}
+
+
+@pytest.mark.asyncio
+async def test_failed_discovery_is_retried_on_the_next_cycle() -> None:
+    """Test a failed list fetch does not wait for the discovery interval."""
+    data_provider = ListDataProvider()
+    client = TalentSolarMonitor(data_provider=data_provider, discovery_interval=3600)
+
+    data_provider.fail_lists = True
+    await client.fetch_data()
+    assert client.get_inverters() == []
+    assert data_provider.list_requests == 2
+
+    data_provider.fail_lists = False
+    await client.fetch_data()
+    assert [inverter.entity_id for inverter in client.get_inverters()] == ["inverter"]
+    assert [station.entity_id for station in client.get_power_stations()] == [
+        "station"
+    ]
+    assert data_provider.list_requests == 4
+
+    # Discovered successfully, the lists are only read again after the interval
+    await client.fetch_data()
+    assert data_provider.list_requests == 4
@@ -0,0 +1,112 @@
+"""Tests for the history store."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.tsun.history import HistoryStore
+from custom_components.tsun.pyTalentMonitor.power_station import PowerStation
+
+START = datetime(2026, 6, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def record(store: HistoryStore, station: PowerStation, at: datetime, power) -> None:
+    """Update the power station and stage its values at the given time."""
+    station.update({"totalActivePower": power})
+    store.record(station, at.timestamp())
+
+
+def flush(store: HistoryStore) -> None:
+    """Write the staged rows as the coordinator does."""
+    store.flush(store.take_pending())
+
+
+def test_record_and_query(tmp_path) -> None:
+    """Test recorded values are returned as columns aligned with the times."""
+    store = HistoryStore(tmp_path)
+    station = PowerStation("station-1", "Home")
+    for minute, power in ((0, 100), (1, 200), (2, 300)):
+        record(store, station, START + timedelta(minutes=minute), power)
+    flush(store)
+
+    result = store.query("station-1", START, START + timedelta(hours=1))
+
+    assert result["time"] == [
+        int((START + timedelta(minutes=minute)).timestamp()) for minute in range(3)
+    ]
+    assert result["values"] == {"totalActivePower": [100.0, 200.0, 300.0]}
+    assert store.query("station-1", START, START, channels=["other"])["values"] == {}
+
+
+def test_unchanged_values_are_recorded_once(tmp_path) -> None:
+    """Test a device whose revision did not change is not recorded again."""
+    store = HistoryStore(tmp_path)
+    station = PowerStation("station-1", "Home")
+    record(store, station, START, 100)
+    store.record(station, (START + timedelta(minutes=1)).timestamp())
+    flush(store)
+
+    assert len(store.query("station-1", START, START + timedelta(hours=1))["time"]) == 1
+
+
+def test_samples_are_downsampled(tmp_path) -> None:
+    """Test a completed 5 minute bucket is written with mean, min and max."""
+    store = HistoryStore(tmp_path)
+    station = PowerStation("station-1", "Home")
+    record(store, station, START, 100)
+    record(store, station, START + timedelta(minutes=1), 200)
+    record(store, station, START + timedelta(minutes=5), 300)
+    flush(store)
+
+    result = store.query("station-1", START, START + timedelta(hours=1), "5min")
+
+    assert result["time"] == [int(START.timestamp())]
+    assert result["values"] == {
+        "totalActivePower.mean": [150.0],
+        "totalActivePower.min": [100.0],
+        "totalActivePower.max": [200.0],
+    }
+
+
+def test_take_pending_detaches_the_staged_rows(tmp_path) -> None:
+    """Test rows recorded after take_pending are kept for the next flush."""
+    store = HistoryStore(tmp_path)
+    station = PowerStation("station-1", "Home")
+    record(store, station, START, 100)
+
+    pending = store.take_pending()
+    record(store, station, START + timedelta(minutes=1), 200)
+    store.flush(pending)
+    assert store.query("station-1", START, START + timedelta(hours=1))["values"] == {
+        "totalActivePower": [100.0]
+    }
+
+    flush(store)
+    assert store.query("station-1", START, START + timedelta(hours=1))["values"] == {
+        "totalActivePower": [100.0, 200.0]
+    }
+    assert store.take_pending() == {}
+
+
+def test_prune_removes_expired_files(tmp_path) -> None:
+    """Test raw files older than their retention are removed."""
+    store = HistoryStore(tmp_path)
+    station = PowerStation("station-1", "Home")
+    old = START - timedelta(days=10)
+    record(store, station, old, 100)
+    record(store, station, START, 200)
+    flush(store)
+
+    store.prune(START)
+
+    assert store.query("station-1", old, old + timedelta(hours=1))["time"] == []
+    assert store.query("station-1", START, START + timedelta(hours=1))["values"] == {
+        "totalActivePower": [200.0]
+    }
+
+
+def test_prune_is_due_once_per_day(tmp_path) -> None:
+    """Test pruning is requested on the first flush of each UTC day."""
+    store = HistoryStore(tmp_path)
+
+    assert store.prune_due(START.timestamp())
+    assert not store.prune_due((START + timedelta(hours=1)).timestamp())
+    assert store.prune_due((START + timedelta(days=1)).timestamp())
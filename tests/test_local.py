@@ -0,0 +1,33 @@
+"""Tests for the local data source of a TSUN proxy."""
+
+import json
+
+from custom_components.tsun.pyTalentMonitor.local import LocalInverterDataProvider
+
+GRID = json.dumps({"Voltage": 230.1, "Current": 1.2, "Output_Power": 276})
+
+
+def test_repeated_message_keeps_the_revision() -> None:
+    """Test a message without changed values does not update the inverter."""
+    data_provider = LocalInverterDataProvider()
+    updates = []
+    data_provider.add_update_listener(updates.append)
+
+    data_provider.handle_message("tsun/node-1/grid", GRID)
+    inverter = data_provider.inverters[0]
+    revision = inverter.revision
+    data_provider.handle_message("tsun/node-1/grid", GRID)
+
+    assert inverter.revision == revision
+    assert inverter.values["lastDataUpdateTime"].value is not None
+    assert updates == [inverter]
+
+
+def test_other_categories_are_ignored() -> None:
+    """Test messages of topics that are not inverter states create no inverter."""
+    data_provider = LocalInverterDataProvider()
+
+    data_provider.handle_message("tsun/node-1/controller", json.dumps({"a": 1}))
+    data_provider.handle_message("tsun/node-1/grid/extra", GRID)
+
+    assert data_provider.inverters == []
@@ -0,0 +1,31 @@
+"""Tests for the request metrics."""
+
+import pytest
+
+from custom_components.tsun.pyTalentMonitor.metrics import ApiMetrics
+
+
+def test_last_cycle_latency_follows_the_recent_requests() -> None:
+    """Test the latency of the last cycle is not diluted by older cycles."""
+    metrics = ApiMetrics()
+    assert metrics.last_cycle_latency_mean is None
+
+    for _ in range(9):
+        metrics.record_request("endpoint?id=1", 1.0, 200)
+    metrics.record_cycle(9.0)
+    assert metrics.last_cycle_latency_mean == pytest.approx(1.0)
+
+    metrics.record_request("endpoint?id=2", 0.1, 200)
+    metrics.record_cycle(0.1)
+    assert metrics.last_cycle_latency_mean == pytest.approx(0.1)
+    assert metrics.latency_mean == pytest.approx(0.91)
+
+
+def test_cycle_without_requests_keeps_the_last_latency() -> None:
+    """Test a cycle that sent no request does not clear the latency."""
+    metrics = ApiMetrics()
+    metrics.record_request("endpoint", 0.5, 200)
+    metrics.record_cycle(0.5)
+    metrics.record_cycle(0.0)
+    assert metrics.last_cycle_latency_mean == pytest.approx(0.5)
+    assert metrics.as_dict()["last_cycle_latency_mean"] == pytest.approx(0.5)
@@ -0,0 +1,157 @@
+"""Tests for the paged enumeration of the device lists."""
+
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from custom_components.tsun.pyTalentMonitor import data_provider as data_provider_module
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    DataProvider,
+    IncompleteListError,
+)
+from custom_components.tsun.pyTalentMonitor.inverter import InverterDataProvider
+
+INVERTER_LIST = "tools/device/selectDeviceInverter"
+
+
+class PagedDataProvider(DataProvider):
+    """DataProvider serving a list of inverters and their details."""
+
+    def __init__(
+        self,
+        inverters: int,
+        page_size: int = 10,
+        page_prefetch: int = 2,
+        with_total: bool = True,
+        ignore_paging: bool = False,
+    ) -> None:
+        """Initialize the fake API."""
+        super().__init__(
+            "user", "password", None, page_size=page_size, page_prefetch=page_prefetch
+        )
+        self.rows = [{"deviceGuid": f"guid-{index}"} for index in range(inverters)]
+        self.with_total = with_total
+        self.ignore_paging = ignore_paging
+        self.failing_pages: set[int] = set()
+        self.page_gates: dict[int, asyncio.Event] = {}
+        self.requested_pages: list[int] = []
+        self.detail_requests: list[str] = []
+        self.detail_event = asyncio.Event()
+
+    async def get_data(self, endpoint, fields=None):
+        """Return a page of the list or the details of an inverter."""
+        query = parse_qs(urlsplit(endpoint).query)
+        if "deviceGuid" in query:
+            self.detail_requests.append(query["deviceGuid"][0])
+            self.detail_event.set()
+            return {"data": {"activePower": 1}}
+
+        page = int(query["pageNum"][0])
+        page_size = int(query["pageSize"][0])
+        self.requested_pages.append(page)
+        if page in self.page_gates:
+            await self.page_gates[page].wait()
+        if page in self.failing_pages:
+            return None
+        start = 0 if self.ignore_paging else (page - 1) * page_size
+        response = {"rows": self.rows[start : start + page_size]}
+        if self.ignore_paging:
+            response["rows"] = self.rows
+        if self.with_total:
+            response["total"] = len(self.rows)
+        return response
+
+
+async def read_pages(data_provider: DataProvider, key: str | None = "deviceGuid"):
+    """Return the number of rows of each page."""
+    return [
+        len(rows) async for rows in data_provider.iter_pages(INVERTER_LIST, key=key)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pages_with_total() -> None:
+    """Test all pages are read once when the total is reported."""
+    data_provider = PagedDataProvider(25)
+    assert await read_pages(data_provider) == [10, 10, 5]
+    assert sorted(data_provider.requested_pages) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_pages_without_total() -> None:
+    """Test the pages are read until a short page without a total."""
+    data_provider = PagedDataProvider(20, with_total=False)
+    assert await read_pages(data_provider) == [10, 10]
+    assert data_provider.requested_pages == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_ignored_paging_without_total_stops() -> None:
+    """Test a page repeating the rows already read ends the list."""
+    data_provider = PagedDataProvider(10, with_total=False, ignore_paging=True)
+    assert await read_pages(data_provider) == [10]
+    assert data_provider.requested_pages == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_page_cap(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test at most MAX_PAGES pages are read."""
+    monkeypatch.setattr(data_provider_module, "MAX_PAGES", 3)
+    data_provider = PagedDataProvider(100, with_total=False)
+    assert await read_pages(data_provider, key=None) == [10, 10, 10]
+
+
+@pytest.mark.asyncio
+async def test_failed_page_raises() -> None:
+    """Test a failed page is reported instead of ending the list silently."""
+    data_provider = PagedDataProvider(25)
+    data_provider.failing_pages.add(2)
+    with pytest.raises(IncompleteListError):
+        await read_pages(data_provider)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_limited() -> None:
+    """Test no more than page_prefetch pages are requested ahead."""
+    data_provider = PagedDataProvider(100, page_prefetch=2)
+    pages = data_provider.iter_pages(INVERTER_LIST)
+    await anext(pages)
+    await asyncio.sleep(0)
+    assert sorted(data_provider.requested_pages) == [1, 2, 3]
+    await pages.aclose()
+
+
+@pytest.mark.asyncio
+async def test_details_are_fetched_as_pages_arrive() -> None:
+    """Test the devices of a page are fetched before the next page arrives."""
+    data_provider = PagedDataProvider(15)
+    data_provider.page_gates[2] = asyncio.Event()
+    inverters = InverterDataProvider(data_provider)
+
+    task = asyncio.create_task(inverters.fetch_data())
+    await asyncio.wait_for(data_provider.detail_event.wait(), 1)
+    assert not task.done()
+    assert set(data_provider.detail_requests) <= {f"guid-{i}" for i in range(10)}
+
+    data_provider.page_gates[2].set()
+    assert await task is True
+    assert sorted(data_provider.detail_requests) == sorted(
+        f"guid-{index}" for index in range(15)
+    )
+    assert all(
+        inverter.values["activePower"].value == 1 for inverter in inverters.inverters
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_discovery_keeps_known_devices() -> None:
+    """Test a failed list still fetches the devices found before."""
+    data_provider = PagedDataProvider(15)
+    inverters = InverterDataProvider(data_provider)
+    assert await inverters.fetch_data() is True
+
+    data_provider.failing_pages.add(1)
+    data_provider.detail_requests.clear()
+    assert await inverters.fetch_data() is False
+    assert len(data_provider.detail_requests) == 15
@@ -0,0 +1,68 @@
+"""Tests for the projected decoding of API responses."""
+
+import json
+
+import pytest
+
+from custom_components.tsun.pyTalentMonitor import projection
+
+DOCUMENT = json.dumps(
+    {
+        "code": 0,
+        "data": {
+            "deviceGuid": "device-1",
+            "unused": {"nested": [1, 2, 3]},
+            "pv": [
+                {"power": 10, "voltage": 30, "unused": True},
+                {"power": 20, "unused": None},
+            ],
+        },
+        "unused": "value",
+    }
+)
+FIELDS = frozenset({"code", "data", "deviceGuid", "pv", "power", "voltage"})
+PROJECTED = {
+    "code": 0,
+    "data": {
+        "deviceGuid": "device-1",
+        "pv": [{"power": 10, "voltage": 30}, {"power": 20}],
+    },
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def decoder(request, monkeypatch) -> str:
+    """Run a test with orjson and with the standard library fallback."""
+    if request.param == "orjson":
+        if projection.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(projection, "orjson", None)
+    return request.param
+
+
+def test_project() -> None:
+    """Test objects at any depth are reduced to the fields."""
+    assert projection.project(json.loads(DOCUMENT), FIELDS) == PROJECTED
+    assert projection.project([1, "a", None], FIELDS) == [1, "a", None]
+
+
+def test_loads_projected(decoder: str) -> None:
+    """Test the standard library drops the fields that are not projected.
+
+    orjson decodes the complete document faster than projecting it.
+    """
+    expected = json.loads(DOCUMENT) if decoder == "orjson" else PROJECTED
+    assert projection.loads(DOCUMENT, FIELDS) == expected
+    assert projection.loads(DOCUMENT.encode(), FIELDS) == expected
+
+
+def test_loads_without_fields(decoder: str) -> None:
+    """Test decoding without projection keeps the complete document."""
+    assert projection.loads(DOCUMENT) == json.loads(DOCUMENT)
+
+
+def test_loads_invalid_document(decoder: str) -> None:
+    """Test invalid JSON raises ValueError with both decoders."""
+    with pytest.raises(ValueError):
+        projection.loads("{invalid", FIELDS)
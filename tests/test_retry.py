@@ -0,0 +1,223 @@
+"""Tests for the retry policy and the circuit breaker."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from aiohttp import ClientError, ClientResponseError
+import pytest
+
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    AuthenticationError,
+    DataProvider,
+)
+from custom_components.tsun.pyTalentMonitor.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class LoginDataProvider(DataProvider):
+    """DataProvider whose login is replaced by a coroutine function."""
+
+    def __init__(self, login) -> None:
+        """Initialize with the login replacement."""
+        super().__init__("user", "password", None)
+        self._login = login
+
+    async def _async_login(self) -> str:
+        """Run the login replacement."""
+        return await self._login()
+
+
+class LoginResponse:
+    """Response of the login endpoint."""
+
+    def __init__(self, status: int, data: dict) -> None:
+        """Initialize with the status and the decoded body."""
+        self.status = status
+        self.headers = {"Retry-After": "0"}
+        self.request_info = None
+        self.history = ()
+        self._data = data
+
+    async def read(self) -> bytes:
+        """Return an empty body."""
+        return b""
+
+    async def json(self) -> dict:
+        """Return the decoded body."""
+        return self._data
+
+
+class LoginSession:
+    """Session answering the login requests with the given responses."""
+
+    def __init__(self, *responses: LoginResponse) -> None:
+        """Initialize with the responses to return."""
+        self.responses = list(responses)
+        self.posts = 0
+
+    async def post(self, url: str, **kwargs) -> LoginResponse:
+        """Return the next response."""
+        self.posts += 1
+        return self.responses.pop(0)
+
+
+def open_breaker(reset_timeout: float) -> CircuitBreaker:
+    """Return a circuit breaker opened by a single failure."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    return breaker
+
+
+def test_backoff_delay_is_bounded() -> None:
+    """Test the full jitter backoff stays within the exponential bound."""
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.5, maximum=4)
+        assert 0 <= delay <= min(4, 0.5 * 2**attempt)
+
+
+def test_parse_retry_after() -> None:
+    """Test Retry-After in seconds and as HTTP date."""
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("invalid") is None
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+
+def test_circuit_opens_after_threshold() -> None:
+    """Test the circuit opens after consecutive failures and fails fast."""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_success_resets_failures() -> None:
+    """Test a success in between keeps the circuit closed."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_a_single_trial_through() -> None:
+    """Test only one trial request is sent while the circuit is half open."""
+    breaker = open_breaker(reset_timeout=0)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_request() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_request() is False
+
+
+def test_failed_trial_reopens_the_circuit() -> None:
+    """Test a failed trial opens the circuit again."""
+    breaker = open_breaker(reset_timeout=0)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.trips == 2
+    assert breaker.before_request() is True
+
+
+@pytest.mark.asyncio
+async def test_failed_login_in_half_open_state_ends_the_trial() -> None:
+    """Test a trial whose login fails does not block all later requests."""
+    logins = 0
+
+    async def login() -> str:
+        nonlocal logins
+        logins += 1
+        raise ClientError("connection refused")
+
+    data_provider = LoginDataProvider(login)
+    data_provider._circuit_breaker = open_breaker(reset_timeout=0)
+
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            await data_provider.get_data("endpoint")
+    assert logins == 3
+    assert data_provider.circuit_breaker.trips == 4
+
+
+@pytest.mark.asyncio
+async def test_refused_login_in_half_open_state_closes_the_circuit() -> None:
+    """Test refused credentials count as an answer of the API."""
+
+    async def login() -> str:
+        raise AuthenticationError("Authentication failed")
+
+    data_provider = LoginDataProvider(login)
+    data_provider._circuit_breaker = open_breaker(reset_timeout=0)
+
+    with pytest.raises(AuthenticationError):
+        await data_provider.get_data("endpoint")
+    assert data_provider.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_is_released() -> None:
+    """Test a cancelled trial lets the next request become the trial."""
+    login_started = asyncio.Event()
+
+    async def login() -> str:
+        login_started.set()
+        await asyncio.Event().wait()
+
+    data_provider = LoginDataProvider(login)
+    breaker = data_provider._circuit_breaker = open_breaker(reset_timeout=0)
+
+    task = asyncio.create_task(data_provider.get_data("endpoint"))
+    await login_started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.before_request() is True
+
+
+@pytest.mark.asyncio
+async def test_overloaded_login_is_retried() -> None:
+    """Test a login answered with a retryable status is sent again."""
+    session = LoginSession(LoginResponse(503, {}), LoginResponse(200, {"token": "t"}))
+    data_provider = DataProvider("user", "password", session, max_retries=1)
+
+    assert await data_provider._async_login() == "t"
+    assert session.posts == 2
+
+
+@pytest.mark.asyncio
+async def test_overloaded_login_counts_as_failure() -> None:
+    """Test a login failing with a retryable status is not a credential error."""
+    session = LoginSession(LoginResponse(429, {}), LoginResponse(500, {}))
+    data_provider = DataProvider("user", "password", session, max_retries=1)
+    data_provider._circuit_breaker = open_breaker(reset_timeout=0)
+
+    with pytest.raises(ClientResponseError):
+        await data_provider.get_data("endpoint")
+    assert data_provider.circuit_breaker.trips == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_credentials_raise_authentication_error() -> None:
+    """Test a login answered without a token refuses the credentials."""
+    session = LoginSession(LoginResponse(200, {"code": 401}))
+    data_provider = DataProvider("user", "password", session)
+
+    with pytest.raises(AuthenticationError):
+        await data_provider._async_login()
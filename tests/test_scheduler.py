@@ -0,0 +1,82 @@
+"""Tests for the adaptive polling scheduler."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.tsun.scheduler import (
+    MIN_INTERVAL,
+    NIGHT_INTERVAL,
+    AdaptivePollingScheduler,
+)
+
+BASE_INTERVAL = timedelta(seconds=30)
+CADENCE = timedelta(minutes=5)
+START = datetime(2026, 6, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def learned_scheduler() -> tuple[AdaptivePollingScheduler, datetime]:
+    """Return a scheduler that saw three upstream updates, and the last one."""
+    scheduler = AdaptivePollingScheduler(BASE_INTERVAL)
+    for index in range(3):
+        upstream = START + index * CADENCE
+        scheduler.observe(upstream, upstream + timedelta(seconds=12))
+    return scheduler, START + 2 * CADENCE
+
+
+def test_base_interval_until_cadence_is_known() -> None:
+    """Test the base interval is used before a cadence was learned."""
+    scheduler = AdaptivePollingScheduler(BASE_INTERVAL)
+    assert scheduler.next_interval(START, True, None) == BASE_INTERVAL
+    scheduler.observe(START, START)
+    assert scheduler.cadence is None
+    assert scheduler.next_interval(START, True, None) == BASE_INTERVAL
+
+
+def test_implausible_cadence_is_ignored() -> None:
+    """Test distances outside the plausible range are not learned."""
+    scheduler = AdaptivePollingScheduler(BASE_INTERVAL)
+    scheduler.observe(START, START)
+    scheduler.observe(START + timedelta(seconds=5), START + timedelta(seconds=5))
+    assert scheduler.cadence is None
+
+
+def test_poll_is_aligned_with_expected_update() -> None:
+    """Test the next poll follows the expected upstream update."""
+    scheduler, last_update = learned_scheduler()
+    assert scheduler.cadence == CADENCE
+
+    now = last_update + timedelta(seconds=12)
+    interval = scheduler.next_interval(now, True, None)
+    # Next update plus the observed delay of 12 s and the margin of 5 s
+    assert interval == CADENCE + timedelta(seconds=5)
+
+
+def test_overdue_update_backs_off_to_base_interval() -> None:
+    """Test an overdue update is not checked at the minimum interval forever."""
+    scheduler, last_update = learned_scheduler()
+    now = last_update + 2 * CADENCE
+
+    intervals = [scheduler.next_interval(now, True, None) for _ in range(100)]
+    assert intervals[:3] == [MIN_INTERVAL, 2 * MIN_INTERVAL, BASE_INTERVAL]
+    assert set(intervals[2:]) == {BASE_INTERVAL}
+
+
+def test_new_update_resets_the_back_off() -> None:
+    """Test a new upstream update restarts the overdue checks at the minimum."""
+    scheduler, last_update = learned_scheduler()
+    now = last_update + 2 * CADENCE
+    for _ in range(5):
+        scheduler.next_interval(now, True, None)
+
+    upstream = last_update + CADENCE
+    scheduler.observe(upstream, upstream + timedelta(seconds=12))
+    later = upstream + 2 * CADENCE
+    assert scheduler.next_interval(later, True, None) == MIN_INTERVAL
+
+
+def test_night_interval_until_sunrise() -> None:
+    """Test the night interval and an earlier sunrise."""
+    scheduler = AdaptivePollingScheduler(BASE_INTERVAL)
+    assert scheduler.next_interval(START, False, None) == NIGHT_INTERVAL
+    sunrise = START + timedelta(minutes=7)
+    assert scheduler.next_interval(START, False, sunrise) == timedelta(minutes=7)
+    assert scheduler.next_interval(START, False, START) == MIN_INTERVAL
@@ -0,0 +1,58 @@
+"""Tests for the sensor descriptions and write filters."""
+
+from custom_components.tsun.pyTalentMonitor.data_provider import SENSOR_KEYS
+from custom_components.tsun.sensor import (
+    SENSOR_TYPES,
+    WRITE_FILTERS,
+    SensorWriteFilter,
+)
+from homeassistant.components.sensor import SensorDeviceClass
+
+
+def test_sensor_keys_match_the_sensor_types() -> None:
+    """Test the library keeps exactly the values described as sensors."""
+    assert sorted(SENSOR_KEYS) == sorted(
+        description.key for description in SENSOR_TYPES
+    )
+
+
+def test_absolute_deadband() -> None:
+    """Test changes within the absolute deadband are insignificant."""
+    write_filter = SensorWriteFilter(absolute=1.0)
+
+    assert not write_filter.is_significant(230.0, 230.9)
+    assert not write_filter.is_significant("230", "229.5")
+    assert write_filter.is_significant(230.0, 231.5)
+    assert write_filter.is_significant(230.0, 228.5)
+
+
+def test_relative_deadband() -> None:
+    """Test the deadband grows with the written value."""
+    write_filter = SensorWriteFilter(absolute=0.05, relative=0.02)
+
+    # 2% of 10 A exceeds the absolute deadband
+    assert not write_filter.is_significant(10.0, 10.15)
+    assert write_filter.is_significant(10.0, 10.25)
+    # Near zero, the absolute deadband applies
+    assert not write_filter.is_significant(0.0, 0.04)
+    assert write_filter.is_significant(0.0, 0.06)
+
+
+def test_non_numeric_values_are_compared_for_equality() -> None:
+    """Test unknown or textual values are significant whenever they change."""
+    write_filter = SensorWriteFilter(absolute=1.0)
+
+    assert write_filter.is_significant(None, 230.0)
+    assert write_filter.is_significant(230.0, None)
+    assert not write_filter.is_significant(None, None)
+    assert not write_filter.is_significant("unknown", "unknown")
+
+
+def test_power_has_no_absolute_deadband() -> None:
+    """Test the power filter is unit independent, the API reports W or kW."""
+    write_filter = WRITE_FILTERS[SensorDeviceClass.POWER]
+
+    assert write_filter.absolute == 0.0
+    assert not write_filter.is_significant(1.00, 1.01)
+    assert write_filter.is_significant(1.00, 1.03)
+    assert write_filter.min_interval < write_filter.max_interval
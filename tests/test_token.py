@@ -0,0 +1,181 @@
+"""Tests for the token manager."""
+
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from custom_components.tsun.pyTalentMonitor import data_provider
+from custom_components.tsun.pyTalentMonitor.data_provider import (
+    TOKEN_REFRESH_MARGIN,
+    TokenManager,
+    decode_token_expiry,
+)
+
+
+def jwt(expires_at: float) -> str:
+    """Return an unsigned JWT with the given exp claim."""
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": expires_at}).encode())
+    return f"header.{claims.decode().rstrip('=')}.signature"
+
+
+class CountingLogin:
+    """Login returning the next token of a list and counting the calls."""
+
+    def __init__(self, *tokens: str) -> None:
+        """Initialize with the tokens to return."""
+        self.tokens = list(tokens)
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self) -> str:
+        """Return the next token once released."""
+        self.calls += 1
+        await self.release.wait()
+        return self.tokens.pop(0)
+
+
+def test_decode_token_expiry() -> None:
+    """Test the exp claim is read from JWT tokens only."""
+    assert decode_token_expiry(jwt(1234.0)) == 1234.0
+    assert decode_token_expiry("opaque-token") is None
+    assert decode_token_expiry("a.not-base64!.c") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_share_one_login() -> None:
+    """Test concurrent callers without a valid token trigger a single login."""
+    login = CountingLogin("token")
+    login.release.clear()
+    token_manager = TokenManager(login)
+
+    tasks = [asyncio.create_task(token_manager.async_get_token()) for _ in range(5)]
+    await asyncio.sleep(0)
+    login.release.set()
+
+    assert await asyncio.gather(*tasks) == ["token"] * 5
+    assert login.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_replaced_once() -> None:
+    """Test callers whose token was refused share the replacing login."""
+    login = CountingLogin("first", "second")
+    token_manager = TokenManager(login)
+    rejected = await token_manager.async_get_token()
+
+    tokens = await asyncio.gather(
+        token_manager.async_refresh(rejected), token_manager.async_refresh(rejected)
+    )
+
+    assert tokens == ["second", "second"]
+    assert login.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_ahead_of_its_expiry(monkeypatch) -> None:
+    """Test a token about to expire is no longer valid and gets replaced."""
+    now = time.time()
+    monkeypatch.setattr(data_provider.time, "time", lambda: now)
+    expiring = jwt(now + 3600)
+    fresh = jwt(now + 7200)
+    login = CountingLogin(expiring, fresh)
+    token_manager = TokenManager(login)
+
+    assert await token_manager.async_get_token() == expiring
+    now += 3600 - TOKEN_REFRESH_MARGIN - 1
+    assert token_manager.is_valid
+    assert await token_manager.async_get_token() == expiring
+
+    now += 2
+    assert not token_manager.is_valid
+    assert await token_manager.async_get_token() == fresh
+    assert token_manager.expires_at == decode_token_expiry(fresh)
+    assert login.calls == 2
+
+
+def test_restore_token() -> None:
+    """Test persisted tokens are only restored while they are usable."""
+    token_manager = TokenManager(CountingLogin())
+
+    assert not token_manager.restore_token("expired", time.time() - 1)
+    assert not token_manager.restore_token(
+        "expiring", time.time() + TOKEN_REFRESH_MARGIN / 2
+    )
+    assert token_manager.token is None
+
+    expires_at = time.time() + 3600
+    assert token_manager.restore_token("restored", expires_at)
+    assert token_manager.token == "restored"
+    assert token_manager.expires_at == expires_at
+    assert token_manager.is_valid
+
+
+@pytest.mark.asyncio
+async def test_listeners_get_each_new_token() -> None:
+    """Test the listeners are informed after each login, until removed."""
+    token_manager = TokenManager(CountingLogin("first", "second"))
+    received = []
+    remove_listener = token_manager.add_listener(
+        lambda token, expires_at: received.append(token)
+    )
+
+    await token_manager.async_login()
+    remove_listener()
+    await token_manager.async_login()
+
+    assert received == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_lifetime_is_learned_from_repeated_rejections(monkeypatch) -> None:
+    """Test tokens without expiry get a lifetime two rejections agree on."""
+    now = time.time()
+    monkeypatch.setattr(data_provider.time, "time", lambda: now)
+    token_manager = TokenManager(CountingLogin("first", "second", "third", "fourth"))
+
+    rejected = await token_manager.async_get_token()
+    now += 3600
+    rejected = await token_manager.async_refresh(rejected)
+    assert token_manager.expires_at is None
+
+    now += 3500
+    await token_manager.async_refresh(rejected)
+    assert token_manager.expires_at == pytest.approx(now + 3500)
+
+
+@pytest.mark.asyncio
+async def test_stray_rejection_does_not_shorten_the_lifetime(monkeypatch) -> None:
+    """Test a single early 401 between longer lifetimes is not learned."""
+    now = time.time()
+    monkeypatch.setattr(data_provider.time, "time", lambda: now)
+    token_manager = TokenManager(CountingLogin("first", "second", "third", "fourth"))
+
+    rejected = await token_manager.async_get_token()
+    now += 3600
+    rejected = await token_manager.async_refresh(rejected)
+    now += 300
+    rejected = await token_manager.async_refresh(rejected)
+    now += 3600
+    await token_manager.async_refresh(rejected)
+
+    assert token_manager.expires_at is None
+
+
+@pytest.mark.asyncio
+async def test_restored_token_lifetime_is_not_learned(monkeypatch) -> None:
+    """Test the time since a token was restored is not taken as its lifetime."""
+    now = time.time()
+    monkeypatch.setattr(data_provider.time, "time", lambda: now)
+    token_manager = TokenManager(CountingLogin("first", "second"))
+
+    token_manager.restore_token("restored", None)
+    now += 300
+    rejected = await token_manager.async_refresh("restored")
+    now += 300
+    await token_manager.async_refresh(rejected)
+
+    assert token_manager.expires_at is None